@@ -0,0 +1,214 @@
+import argparse
+import contextlib
+import ctypes
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import secp256k1 as ice
+from plans import Plan, shift_left, inverse, rotate_hex
+from scanner import scan_value, scan_values, generate_batch, hash_candidates, DEFAULT_PLAN
+from targets import TargetSet
+from viewport import Viewport
+from render import color_for_value, render_row, TileCache
+from metrics import Metrics
+
+# Import and secp256k1 table setup of a fresh headless process beyond the
+# interpreter's own start, in ms. Every spawned scan process pays it
+STARTUP_BUDGET_MS = 100
+
+# A 72 bit value of the puzzle range, in the forms the transform helpers take
+SAMPLE_VALUE = 0x1a2b3c4d5e6f708192
+SAMPLE_BITS = bin(SAMPLE_VALUE)[2:].zfill(72)
+SAMPLE_HEX = f'{SAMPLE_VALUE:018x}'
+
+def bench_transforms():
+    yield 'shift_left', 1, lambda: shift_left(SAMPLE_BITS, 13)
+    yield 'inverse', 1, lambda: inverse(SAMPLE_BITS)
+    yield 'rotate_hex', 1, lambda: rotate_hex(SAMPLE_HEX)
+    plan = Plan()
+    yield 'plan_keys', 1, lambda: plan.keys(SAMPLE_VALUE)
+    reference = Plan(plan.text, reference=True)
+    yield 'plan_keys_reference', 1, lambda: reference.keys(SAMPLE_VALUE)
+    values = [SAMPLE_VALUE + i for i in range(64)]
+    yield 'generate_batch_64', 64, lambda: generate_batch(values, plan)
+
+def quiet(fn):
+    """fn with its per-value log lines sent to os.devnull, they still cost their formatting"""
+    devnull = open(os.devnull, 'w')
+    def run():
+        with contextlib.redirect_stdout(devnull):
+            fn()
+    return run
+
+def bench_scan():
+    """process_hex_value hands the value to scan_value in the scan worker"""
+    targets = TargetSet.from_address('12VVRNPi4SJqUTsp6FmqDqY5sGosDtysn4')
+    metrics = Metrics()
+    yield 'scan_value', 1, quiet(lambda: scan_value(SAMPLE_VALUE, targets, None, DEFAULT_PLAN, metrics))
+    values = [SAMPLE_VALUE + i for i in range(64)]
+    yield 'scan_values_64', 64, quiet(lambda: scan_values(values, targets, None, DEFAULT_PLAN, metrics))
+    keys = DEFAULT_PLAN.keys(SAMPLE_VALUE)
+    yield 'hash_candidates', DEFAULT_PLAN.count, lambda: hash_candidates(keys)
+
+def bench_secp256k1(workdir):
+    rng = random.Random(1)
+    key = rng.getrandbits(256) % ice.N
+    yield 'privatekey_to_address', 1, lambda: ice.privatekey_to_address(0, True, key)
+    yield 'privatekey_to_h160', 1, lambda: ice.privatekey_to_h160(0, True, key)
+    scalar = key.to_bytes(32, 'big')
+    h160 = (ctypes.c_char * 20)()
+    yield 'privatekey_to_h160_into', 1, lambda: ice.privatekey_to_h160_into(0, True, scalar, h160)
+    pubkey = ice.scalar_multiplication(key)
+    point = (ctypes.c_char * 65)()
+    yield 'scalar_multiplication', 1, lambda: ice.scalar_multiplication(key)
+    yield 'scalar_multiplication_into', 1, lambda: ice.scalar_multiplication_into(scalar, point)
+    yield 'pubkey_to_h160', 1, lambda: ice.pubkey_to_h160(0, True, pubkey)
+    yield 'pubkey_to_h160_into', 1, lambda: ice.pubkey_to_h160_into(0, True, pubkey, h160)
+    keys = [rng.getrandbits(256) % ice.N for _ in range(1000)]
+    yield 'scalar_multiplications', len(keys), lambda: ice.scalar_multiplications(keys)
+    packed = b''.join(k.to_bytes(32, 'big') for k in keys)
+    yield 'scalar_multiplications_packed', len(keys), lambda: ice.scalar_multiplications_packed(packed)
+    yield 'privatekeys_to_h160', len(keys), lambda: ice.privatekeys_to_h160(0, True, packed)
+    pubkeys = ice.scalar_multiplications_packed(packed)
+    yield 'pubkeys_to_h160', len(keys), lambda: ice.pubkeys_to_h160(0, True, pubkeys)
+    yield 'privatekey_loop_h160_sse', 1000, lambda: ice.privatekey_loop_h160_sse(1000, 0, True, key)
+
+    # 100k random targets, the lookups mostly miss as a scan does
+    h160s = [rng.getrandbits(160).to_bytes(20, 'big') for _ in range(100000)]
+    hex_file = os.path.join(workdir, 'targets.hex')
+    bin_file = os.path.join(workdir, 'targets.bin')
+    with open(hex_file, 'w') as f:
+        f.writelines(h.hex() + '\n' for h in h160s)
+    ice.prepare_bin_file(hex_file, bin_file, overwrite=True)
+    ice.Load_data_to_memory(bin_file, False)
+    probe = rng.getrandbits(160).to_bytes(20, 'big')
+    yield 'check_collision', 1, lambda: ice.check_collision(probe)
+
+    _bits, _hashes, _bf, _fp, _elem = ice.Fill_in_bloom(h160s)
+    yield 'check_in_bloom', 1, lambda: ice.check_in_bloom(probe, _bits, _hashes, _bf)
+    probes = b''.join(rng.getrandbits(160).to_bytes(20, 'big') for _ in range(4608))
+    yield 'bloom_check_add_mcpu', 4608, lambda: ice.bloom_check_add_mcpu(probes, 4608, 20, 1, 0, _bits, _hashes, _bf)
+
+def bench_render(width=800):
+    """The colour computation and the explorer row without a display"""
+    viewport = Viewport(0x1000000000000000000, 0x1ffffffffffffffffff, width)
+    for name, zoom_level in (('low', 1), ('medium', 100000), ('high', 10000000)):
+        yield f'color_for_value_{name}', 1, lambda z=zoom_level: color_for_value(viewport, SAMPLE_VALUE, z)
+    yield 'render_row', width, lambda: render_row(viewport, width)
+    tiles = TileCache(width)
+    tiles.render_row(viewport)
+    yield 'tile_cache_render_row', width, lambda: tiles.render_row(viewport)
+
+    zoomed = Viewport(0x1000000000000000000, 0x1ffffffffffffffffff, width)
+    zoomed.zoom(1e-15, width // 2, zoomed.value_at(width // 2))
+    yield 'render_row_zoomed', width, lambda: render_row(zoomed, width)
+
+def python(code):
+    """Run code in a fresh interpreter in this directory"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return lambda: subprocess.run([sys.executable, '-c', code], cwd=here, check=True)
+
+def bench_startup():
+    yield 'startup_python', 1, python('pass')
+    yield 'startup_headless', 1, python('import headless, secp256k1; secp256k1.prepare()')
+
+def measure(fn, ops, repeat, min_time):
+    """Best of repeat rounds, in seconds per operation. A round calls fn for at least min_time"""
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        calls = calls * 2 if elapsed <= 0 else max(calls + 1, int(calls * min_time / elapsed * 1.2))
+    best = elapsed
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best / (calls * ops)
+
+def run_benchmarks(only=None, repeat=5, min_time=0.2):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        groups = (bench_transforms(), bench_scan(), bench_secp256k1(workdir), bench_render(), bench_startup())
+        for group in groups:
+            for name, ops, fn in group:
+                if only and not any(pattern in name for pattern in only):
+                    continue
+                seconds = measure(fn, ops, repeat, min_time)
+                results[name] = {'us_per_op': seconds * 1e6, 'ops_per_s': 1 / seconds if seconds else 0.0}
+                print(f'[+] {name:32} {seconds * 1e6:12.3f} us/op {1 / seconds:16,.0f} ops/s')
+    return results
+
+def compare(results, baseline, tolerance):
+    """Names of the benchmarks more than tolerance slower than in the baseline"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get('results', {}).get(name)
+        if old is None:
+            continue
+        change = result['us_per_op'] / old['us_per_op'] - 1
+        result['baseline_us_per_op'] = old['us_per_op']
+        result['change'] = change
+        mark = ' REGRESSION' if change > tolerance else ''
+        print(f'[+] {name:32} {change:+8.1%} against baseline{mark}')
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the scan engine, the secp256k1 wrappers and the rendering in isolation")
+    parser.add_argument('--output', default='bench_output.txt',
+                        help="JSON file the results are written to (default: %(default)s)")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="slowdown against the baseline reported as a regression (default: 0.10)")
+    parser.add_argument('--only', nargs='*', help="run only the benchmarks whose name contains one of these")
+    parser.add_argument('--repeat', type=int, default=5, help="rounds per benchmark, the best counts")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds per round")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Exit status 1 if any benchmark regressed against the baseline"""
+    args = parse_args(argv)
+    results = run_benchmarks(args.only, args.repeat, args.min_time)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    startup_ms = None
+    if 'startup_headless' in results and 'startup_python' in results:
+        startup_ms = (results['startup_headless']['us_per_op'] - results['startup_python']['us_per_op']) / 1000
+        print(f'[+] Headless startup: {startup_ms:.1f} ms over the interpreter, budget {STARTUP_BUDGET_MS} ms')
+        if startup_ms > STARTUP_BUDGET_MS:
+            regressions.append('startup_budget')
+    report = {
+        'time': time.time(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'results': results,
+        'startup_ms': startup_ms,
+        'regressions': regressions,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f'[+] Results written to {args.output}')
+    if regressions:
+        print(f'[-] {len(regressions)} regressions: {", ".join(regressions)}')
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import bisect
+import mmap
+import os
+
+M64 = (1 << 64) - 1
+
+class CoverageIndex:
+    """On-disk record of the input values that have already been scanned.
+
+    Runs of consecutive values, as a linear sweep produces, are kept as a
+    sorted set of disjoint [start, end] spans in <path>.spans. Every value is
+    also set in a hashed bitmap memory-mapped from <path>.bits, so lookups of
+    scattered random-walk points cost one bit test. The bitmap never grows, so
+    it answers "already scanned?" with false positives once it fills up, never
+    with false negatives.
+
+    Memory is capped at bitmap_bytes plus max_spans spans; past that, new runs
+    are only recorded in the bitmap. The index is tied to the plan it was
+    recorded with, since another plan checks other keys for the same values."""
+
+    def __init__(self, path, bitmap_bytes=16 * 1024 * 1024, max_spans=1000000, tag=''):
+        self.path = path
+        self.tag = tag
+        self.max_spans = max_spans
+        self.starts = []
+        self.ends = []
+        self._load_spans()
+
+        bits_file = path + '.bits'
+        if os.path.isfile(bits_file) and os.path.getsize(bits_file) > 0:
+            # An existing bitmap keeps its size, the hashes depend on it
+            bitmap_bytes = os.path.getsize(bits_file)
+        else:
+            with open(bits_file, 'wb') as f:
+                f.truncate(bitmap_bytes)
+        self._bits_file = open(bits_file, 'r+b')
+        self.bitmap = mmap.mmap(self._bits_file.fileno(), bitmap_bytes)
+        self.nbits = bitmap_bytes * 8
+
+        # The run being extended by add(), committed as a span once it ends
+        self.run_start = None
+        self.run_end = None
+
+    def _load_spans(self):
+        spans_file = self.path + '.spans'
+        if not os.path.isfile(spans_file):
+            return
+        with open(spans_file, 'r') as f:
+            header = f.readline().rstrip('\n')
+            if header != '# ' + self.tag:
+                raise ValueError(f"Coverage file {self.path} was recorded with another plan: {header[2:]!r}")
+            for line in f:
+                start, end = line.split()
+                self.starts.append(int(start, 16))
+                self.ends.append(int(end, 16))
+
+    def _bit(self, value):
+        # Multiplicative hash, stable across processes and restarts
+        h = ((value ^ (value >> 64)) * 0x9E3779B97F4A7C15) & M64
+        return (h ^ (h >> 29)) % self.nbits
+
+    def covered(self, value):
+        """True if the value has been scanned, or collides with one in the bitmap"""
+        bit = self._bit(value)
+        if self.bitmap[bit >> 3] & (1 << (bit & 7)):
+            return True
+        if self.run_start is not None and self.run_start <= value <= self.run_end:
+            return True
+        i = bisect.bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.ends[i]
+
+    def add(self, value):
+        """Record one scanned value"""
+        bit = self._bit(value)
+        self.bitmap[bit >> 3] |= 1 << (bit & 7)
+
+        if self.run_start is not None:
+            if value == self.run_end + 1:
+                self.run_end = value
+                return
+            if value == self.run_start - 1:
+                self.run_start = value
+                return
+            self._commit_run()
+        self.run_start = self.run_end = value
+
+    def _commit_run(self):
+        if self.run_start is not None and self.run_end > self.run_start:
+            self.add_span(self.run_start, self.run_end)
+        self.run_start = self.run_end = None
+
+    def add_span(self, start, end):
+        """Record every value of start..end, inclusive, merging with the spans it touches"""
+        i = bisect.bisect_left(self.ends, start - 1)
+        j = bisect.bisect_right(self.starts, end + 1)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        elif len(self.starts) >= self.max_spans:
+            return
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def span_count(self):
+        return len(self.starts)
+
+    def spanned(self):
+        """Number of values inside recorded spans"""
+        return sum(end - start + 1 for start, end in zip(self.starts, self.ends))
+
+    def fill(self):
+        """Fraction of bitmap bits set, the false positive rate of covered() for new points"""
+        return int.from_bytes(self.bitmap, 'big').bit_count() / self.nbits
+
+    def flush(self):
+        """Write the spans and the bitmap to disk"""
+        self._commit_run()
+        spans_file = self.path + '.spans'
+        with open(spans_file + '.tmp', 'w') as f:
+            f.write('# ' + self.tag + '\n')
+            for start, end in zip(self.starts, self.ends):
+                f.write(f'{start:x} {end:x}\n')
+        os.replace(spans_file + '.tmp', spans_file)
+        self.bitmap.flush()
+
+    def close(self):
+        self.flush()
+        self.bitmap.close()
+        self._bits_file.close()
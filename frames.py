@@ -0,0 +1,57 @@
+import time
+
+class FrameScheduler:
+    """Runs the UI work of the explorer at most once per display frame.
+
+    Handlers request named pieces of work instead of doing them. A request
+    replaces any pending one with the same name, so a burst of motion events
+    costs one label update, one crosshair move and one scan submission per
+    frame, for the latest event only.
+
+    The frame interval adapts to load: it is frame_ms while the UI work of a
+    frame stays within ui_share of it, and stretches beyond that, so the rest
+    of every frame is left to the scan worker."""
+
+    def __init__(self, after, frame_ms=16, ui_share=0.5, metrics=None):
+        self.after = after  # root.after
+        self.metrics = metrics
+        self.frame_ms = frame_ms
+        self.ui_share = ui_share
+        self.pending = {}
+        self.scheduled = False
+        self.last_frame = 0.0
+        self.work_ms = 0.0  # Moving average of the UI work per frame
+        self.frames = 0
+        self.coalesced = 0
+
+    def interval_ms(self):
+        return max(self.frame_ms, self.work_ms / self.ui_share)
+
+    def request(self, name, work):
+        """Run work() in the next frame, replacing pending work of the same name"""
+        if name in self.pending:
+            self.coalesced += 1
+        self.pending[name] = work
+        if not self.scheduled:
+            self.scheduled = True
+            elapsed_ms = (time.perf_counter() - self.last_frame) * 1000
+            self.after(max(0, int(self.interval_ms() - elapsed_ms)), self.run_frame)
+
+    def run_frame(self):
+        self.scheduled = False
+        pending, self.pending = self.pending, {}
+        started = time.perf_counter()
+        self.last_frame = started
+        # Pending work runs in the order it was first requested
+        for work in pending.values():
+            work()
+        elapsed = time.perf_counter() - started
+        self.work_ms += (elapsed * 1000 - self.work_ms) * 0.2
+        self.frames += 1
+        if self.metrics is not None:
+            self.metrics.observe('frame', elapsed)
+            self.metrics.count('frames')
+
+    def tick_ms(self):
+        """Delay before the next auto-scroll step: one frame interval"""
+        return max(1, int(self.interval_ms()))
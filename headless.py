@@ -0,0 +1,171 @@
+import argparse
+import os
+import time
+from fractions import Fraction
+from scanner import (ParallelScanner, scan_value, scan_values, hash_candidates, record_found,
+                     PUZZLE_TARGET, PUZZLE_RANGE_START, PUZZLE_RANGE_END)
+from plans import Plan, DEFAULT_PLAN_TEXT, estimate, check_kernel
+from keycache import make_seen_cache
+from viewport import Viewport, AutoScroller
+from targets import TargetSet
+from coverindex import CoverageIndex
+from metrics import METRICS
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Scan the puzzle range without a display, using the same "
+                    "viewport and auto-scroll motion as the explorer window")
+    parser.add_argument('--start', type=lambda s: int(s, 16), default=PUZZLE_RANGE_START,
+                        help="range start in hex (default: puzzle #73)")
+    parser.add_argument('--end', type=lambda s: int(s, 16), default=PUZZLE_RANGE_END,
+                        help="range end in hex (default: puzzle #73)")
+    parser.add_argument('--target', default=PUZZLE_TARGET, help="p2pkh address to search for")
+    parser.add_argument('--target-file',
+                        help="file of addresses or hash160 hex, one per line, searched instead of --target")
+    parser.add_argument('--bloom-fp', type=float, default=0.000001,
+                        help="false positive rate of the Bloom prefilter for --target-file, 0 disables it")
+    parser.add_argument('--plan', default=DEFAULT_PLAN_TEXT,
+                        help="transformation plan, see plans.py (default: %(default)s)")
+    parser.add_argument('--plan-only', action='store_true',
+                        help="print the planner report for --plan, check it against the string transforms and exit")
+    parser.add_argument('--mode', choices=['random', 'linear'], default='random',
+                        help="random walk or linear auto-scroll (default: random)")
+    parser.add_argument('--speed', type=float, default=1.0, help="auto-scroll speed, as the UI slider")
+    parser.add_argument('--direction', type=int, choices=[-1, 1], default=1,
+                        help="linear scroll direction")
+    parser.add_argument('--duration', type=float, default=0,
+                        help="seconds to run, 0 runs until the key is found")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="scan processes, 1 scans in this process (default: all cores)")
+    parser.add_argument('--batch', type=int, default=1,
+                        help="distinct values generated and scanned together, vectorized with NumPy (default: 1)")
+    parser.add_argument('--zoom', type=float, default=1.0,
+                        help="initial zoom around the middle of the range (default: 1)")
+    parser.add_argument('--width', type=int, default=800,
+                        help="virtual canvas width in pixels (default: 800)")
+    parser.add_argument('--cache', choices=['lru', 'bloom', 'none'], default='lru',
+                        help="seen-key cache mode (default: lru)")
+    parser.add_argument('--coverage',
+                        help="coverage index path; values recorded there are skipped and new ones added")
+    parser.add_argument('--coverage-mb', type=int, default=16,
+                        help="coverage bitmap size in MB for a new index (default: 16)")
+    parser.add_argument('--metrics-file', help="JSON file the throughput and stage latency metrics are written to")
+    parser.add_argument('--metrics-interval', type=float, default=10,
+                        help="seconds between metrics status lines and writes (default: 10)")
+    parser.add_argument('--cache-mb', type=int, default=64, help="seen-key cache budget in MB")
+    return parser.parse_args(argv)
+
+def report_plan(plan):
+    """The estimate times the plan's stages, seconds for a wide radius, so only --plan-only runs it"""
+    count, keys_per_second = estimate(plan, lambda keys: hash_candidates(keys, plan.radius))
+    print(f'[+] Plan: {plan.describe()}')
+    print(f'[+] Estimated {keys_per_second:,.0f} keys/s, {keys_per_second / count:,.1f} values/s per process')
+
+def run(args):
+    """Drive the auto-scroll motion as fast as the CPU allows. Returns the found key or None"""
+    plan = Plan(args.plan)
+    if args.plan_only:
+        report_plan(plan)
+        mismatches = check_kernel(plan)
+        if mismatches:
+            print(f'[-] Integer kernel differs from the string transforms for {len(mismatches)} sample values, '
+                  f'first 0x{mismatches[0]:x}')
+        else:
+            print('[+] Integer kernel matches the string transforms on every sample value')
+        return None
+    print(f'[+] Plan: {plan.describe()}')
+
+    if args.target_file:
+        targets = TargetSet.from_file(args.target_file, bloom_fp=args.bloom_fp)
+    else:
+        targets = TargetSet.from_address(args.target)
+    print(f'[+] Searching for {len(targets):,} targets')
+    viewport = Viewport(args.start, args.end, args.width)
+    if args.zoom != 1.0:
+        center_x = args.width // 2
+        viewport.zoom(1 / Fraction(args.zoom), center_x, viewport.value_at(center_x))
+    scroller = AutoScroller(viewport, args.speed, args.direction, args.mode == 'random')
+    if scroller.random_mode:
+        scroller.start_random_walk()
+
+    cache = make_seen_cache(None if args.cache == 'none' else args.cache, args.cache_mb * 1024 * 1024)
+    parallel = ParallelScanner(targets, args.workers, cache, plan) if args.workers > 1 else None
+    coverage = None
+    if args.coverage:
+        coverage = CoverageIndex(args.coverage, args.coverage_mb * 1024 * 1024, tag=plan.text)
+        print(f'[+] Coverage: {coverage.span_count():,} spans, {coverage.spanned():,} values, '
+              f'bitmap {coverage.fill():.4%} full')
+
+    started = time.monotonic()
+    deadline = started + args.duration if args.duration > 0 else None
+    last_value = None
+    batch = []
+    values = 0
+    skipped = 0
+    pvk = None
+    flushed = started
+    reported = started
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            x, value, zoomed = scroller.step()
+            # The walk often stays on one value for several frames
+            if value == last_value:
+                continue
+            last_value = value
+            if coverage is not None:
+                if coverage.covered(value):
+                    skipped += 1
+                    continue
+                # Not yet recorded, the batch is scanned first
+                if value in batch:
+                    continue
+
+            if args.batch > 1:
+                batch.append(value)
+                if len(batch) < args.batch:
+                    continue
+                if parallel is not None:
+                    pvk = parallel.scan_values(batch)
+                else:
+                    pvk = scan_values(batch, targets, cache, plan)
+                scanned, batch = batch, []
+            elif parallel is not None:
+                pvk = parallel.scan_value(value)
+                scanned = [value]
+            else:
+                pvk = scan_value(value, targets, cache, plan)
+                scanned = [value]
+            values += len(scanned)
+            # Recorded only once scanned, so an interrupted scan is not skipped next time
+            if coverage is not None:
+                for v in scanned:
+                    coverage.add(v)
+                if time.monotonic() - flushed > 60:
+                    coverage.flush()
+                    flushed = time.monotonic()
+            if pvk is not None:
+                record_found(pvk)
+                break
+            if time.monotonic() - reported >= args.metrics_interval:
+                print(f'[+] {METRICS.status_line()}')
+                METRICS.maybe_write(args.metrics_file, 0)
+                reported = time.monotonic()
+    finally:
+        if parallel is not None:
+            parallel.close()
+        if coverage is not None:
+            coverage.close()
+        if args.metrics_file:
+            METRICS.write(args.metrics_file)
+
+    elapsed = time.monotonic() - started
+    print(f'[+] Scanned {values:,} values in {elapsed:.1f}s')
+    if coverage is not None:
+        print(f'[+] Skipped {skipped:,} values already in the coverage index')
+    return pvk
+
+def main(argv=None):
+    run(parse_args(argv))
+
+if __name__ == "__main__":
+    main()
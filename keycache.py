@@ -0,0 +1,109 @@
+import ctypes
+import math
+from collections import OrderedDict
+import secp256k1 as ice
+
+# Only the low 10 bytes of a 32 byte key vary for 73 bit scalars
+KEY_BYTES = 10
+
+class SeenKeyCache:
+    """Bounded LRU set of recently checked keys.
+
+    Keys are the 73 bit scalars stored as their low 10 bytes. The cache holds at
+    most max_bytes worth of entries and evicts the least recently seen one."""
+
+    # Cost of one entry with its 10 byte key, from tracemalloc on a full cache
+    # that keeps evicting: 220-245 bytes with the dict's deleted slots (Python 3.11)
+    ENTRY_BYTES = 256
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.capacity = max(1, max_bytes // self.ENTRY_BYTES)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def check_add(self, key):
+        """True if the key was seen before. Either way it becomes the most recent entry"""
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return True
+        entries[key] = None
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+        self.misses += 1
+        return False
+
+    def drop_seen(self, keys, key_bytes=KEY_BYTES):
+        """The packed 32 byte keys whose low key_bytes were not seen before"""
+        return b''.join([keys[i:i + 32] for i in range(0, len(keys), 32)
+                         if not self.check_add(keys[i + 32 - key_bytes:i + 32])])
+
+    def __len__(self):
+        return len(self.entries)
+
+class ApproxSeenKeyCache:
+    """Approximate seen-key cache made of two Bloom filters that age out old keys.
+
+    New keys go into the current filter. Once it holds its share of keys the
+    previous filter is dropped and the current one takes its place, so memory
+    stays fixed. A false positive makes a key look seen when it was not, at a
+    rate set by fp_rate. The filters are checked and filled by the library's
+    batched Bloom calls over the packed key buffer, with the whole 32 byte keys
+    hashed."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, fp_rate=0.001):
+        # Each of the two filters gets half of the budget
+        self.bits = max(64, (max_bytes // 2) * 8)
+        # Keys per filter and hash count that give fp_rate with this many bits
+        ln2 = math.log(2)
+        self.capacity = max(1, int(self.bits * ln2 * ln2 / -math.log(fp_rate)))
+        self.hashes = max(1, round(self.bits / self.capacity * ln2))
+        self.current = bytearray(self.bits // 8)
+        self.previous = bytearray(self.bits // 8)
+        self.count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _check_add(self, keys, num, bloom_filter, check_add):
+        # A ctypes view of the bytearray, which stays picklable for the pool processes
+        view = (ctypes.c_char * len(bloom_filter)).from_buffer(bloom_filter)
+        return ice.bloom_check_add_mcpu(keys, num, 32, 1, check_add, self.bits, self.hashes, view)
+
+    def drop_seen(self, keys, key_bytes=KEY_BYTES):
+        """The packed keys that were (probably) not seen before, which are then added.
+
+        Keys repeated within one buffer are all kept."""
+        num = len(keys) // 32
+        if num == 0:
+            return keys
+        seen = (int.from_bytes(self._check_add(keys, num, self.current, 0), 'big') |
+                int.from_bytes(self._check_add(keys, num, self.previous, 0), 'big'))
+        if seen:
+            seen = seen.to_bytes(num, 'big')
+            keys = b''.join([keys[32 * i:32 * i + 32] for i in range(num) if not seen[i]])
+        fresh = len(keys) // 32
+        self.hits += num - fresh
+        self.misses += fresh
+        if fresh:
+            self._check_add(keys, fresh, self.current, 1)
+            self.count += fresh
+            if self.count >= self.capacity:
+                self.previous = self.current
+                self.current = bytearray(self.bits // 8)
+                self.count = 0
+        return keys
+
+    def __len__(self):
+        return self.count
+
+def make_seen_cache(mode, max_bytes=64 * 1024 * 1024):
+    """'lru' for the exact cache, 'bloom' for the approximate one, None for no cache"""
+    if mode is None:
+        return None
+    if mode == 'lru':
+        return SeenKeyCache(max_bytes)
+    if mode == 'bloom':
+        return ApproxSeenKeyCache(max_bytes)
+    raise ValueError(f"Unknown seen-key cache mode: {mode}")
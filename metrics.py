@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+
+class Histogram:
+    """Latency histogram with power-of-two microsecond buckets"""
+
+    BUCKETS = 40
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        micros = int(seconds * 1e6)
+        self.counts[min(self.BUCKETS - 1, micros.bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples, in seconds"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.max, (1 << i) / 1e6)
+        return self.max
+
+    def summary(self):
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            'count': self.count,
+            'mean_ms': mean * 1000,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+class Metrics:
+    """Counters, gauges and stage latency histograms of one process.
+
+    Scan stages are observed as 'generate', 'cache', 'ec', 'hash' and
+    'compare', the UI as 'render' and 'frame'; 'keys' and 'values' count the
+    work done. Pool processes fill a Metrics of their own per call and the
+    parent merges it in."""
+
+    STAGES = ('generate', 'cache', 'ec', 'hash', 'compare')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        # Counter values at the last status line, for its recent rates
+        self.window_counters = {}
+        self.window_started = time.monotonic()
+        self.last_write = 0.0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def merge(self, other):
+        """Add the counters and histograms of another Metrics, as returned by a pool process"""
+        with self.lock:
+            for name, n in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for name, histogram in other.histograms.items():
+                if name not in self.histograms:
+                    self.histograms[name] = Histogram()
+                self.histograms[name].merge(histogram)
+
+    def snapshot(self):
+        """Everything as one JSON-ready dict, rates averaged since start"""
+        elapsed = max(1e-9, time.time() - self.started)
+        with self.lock:
+            return {
+                'time': time.time(),
+                'uptime_s': elapsed,
+                'counters': dict(self.counters),
+                'rates_per_s': {name: n / elapsed for name, n in self.counters.items()},
+                'gauges': dict(self.gauges),
+                'histograms': {name: h.summary() for name, h in self.histograms.items()},
+            }
+
+    def recent_rates(self):
+        """Per second rates of every counter since the previous call"""
+        now = time.monotonic()
+        elapsed = max(1e-9, now - self.window_started)
+        with self.lock:
+            counters = dict(self.counters)
+        rates = {name: (n - self.window_counters.get(name, 0)) / elapsed for name, n in counters.items()}
+        self.window_counters = counters
+        self.window_started = now
+        return rates
+
+    def status_line(self):
+        rates = self.recent_rates()
+        parts = [f"{rates.get('keys', 0):,.0f} keys/s", f"{rates.get('values', 0):,.1f} values/s"]
+        stages = []
+        for name in self.STAGES:
+            histogram = self.histograms.get(name)
+            if histogram is not None and histogram.count:
+                stages.append(f"{name} {histogram.total / histogram.count * 1000:.1f}")
+        if stages:
+            parts.append(' '.join(stages) + ' ms')
+        frame = self.histograms.get('frame')
+        if frame is not None and frame.count:
+            parts.append(f"frame {frame.total / frame.count * 1000:.1f} ms")
+        if 'queue' in self.gauges:
+            parts.append(f"queue {self.gauges['queue']}")
+        return ' | '.join(parts)
+
+    def write(self, path):
+        """Write snapshot() to path as JSON, replacing the previous file atomically"""
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(path + '.tmp', path)
+        self.last_write = time.monotonic()
+
+    def maybe_write(self, path, interval=10.0):
+        """write() if path is set and interval seconds have passed since the last one"""
+        if path and time.monotonic() - self.last_write >= interval:
+            self.write(path)
+
+# Metrics of this process
+METRICS = Metrics()
@@ -0,0 +1,291 @@
+"""Declarative transformation plans.
+
+A plan describes the candidate family generated from one value:
+
+    bits=72 prefix=1 | invert 0,1 | reverse 0,1 | shift 0..71 | rotate 0..15
+
+The header sets the bit width of the transformed value and the hex prefix
+placed above it to form the private key. An optional radius=K also checks
+the K keys on either side of every candidate, stepped by point addition
+so they cost far less than the candidate's own scalar multiplication.
+
+Each stage after the header lists the parameters to try, either single
+numbers or inclusive a..b ranges:
+
+    invert   0 keeps the value, 1 flips every bit
+    reverse  0 keeps the value, 1 reverses the bit order
+    shift    circular left shift by n bits
+    xor      XOR with the given mask (hex with 0x)
+    rotate   add n to every hex digit, modulo 16
+
+Candidates are every combination of stage parameters, with the first stage
+varying slowest. A plan is compiled once into a flat list of stage
+expanders, so generating a value costs one call per stage input rather
+than one interpretation step per key.
+
+The expanders work on integers with masks, shifts and a byte table. The
+original string transforms stay available with Plan(text, reference=True)
+and check_kernel() compares the two, and the default plan with the
+explorer's original nested loop as well."""
+
+import random
+import time
+
+DEFAULT_PLAN_TEXT = 'bits=72 prefix=1 | invert 0,1 | reverse 0,1 | shift 0..71 | rotate 0..15'
+
+def rotate_hex(hex_string):
+    # Precompute a translation table for all hex digits
+    translation_table = str.maketrans("0123456789abcdef", "123456789abcdef0")
+    return hex_string.translate(translation_table)
+
+def shift_left(s, n):
+    n = n % len(s)
+    return s[n:] + s[:n]
+
+def inverse(binary_string):
+    # Ensure the input is valid
+    if not all(char in '01' for char in binary_string):
+        raise ValueError("Input string must contain only '0' and '1'")
+
+    return ''.join('1' if char == '0' else '0' for char in binary_string)
+
+def _parse_params(text):
+    params = []
+    for item in text.replace(' ', '').split(','):
+        if not item:
+            continue
+        if '..' in item:
+            first, last = item.split('..')
+            params.extend(range(int(first, 0), int(last, 0) + 1))
+        else:
+            params.append(int(item, 0))
+    if not params:
+        raise ValueError(f"Plan stage has no parameters: {text!r}")
+    return params
+
+def _expand_invert(params, bits):
+    full = (1 << bits) - 1
+    def expand(v):
+        return [v ^ full if p else v for p in params]
+    return expand
+
+# Bit-reversed value of every byte
+_REVERSED_BYTES = bytes(int(format(b, '08b')[::-1], 2) for b in range(256))
+
+def _expand_reverse(params, bits):
+    nbytes = (bits + 7) // 8
+    pad = nbytes * 8 - bits
+    def expand(v):
+        # Reverse the byte order and the bits of each byte, then drop the padding
+        r = int.from_bytes(v.to_bytes(nbytes, 'little').translate(_REVERSED_BYTES), 'big') >> pad
+        return [r if p else v for p in params]
+    return expand
+
+def _expand_shift(params, bits):
+    full = (1 << bits) - 1
+    shifts = [(n % bits, bits - n % bits) for n in params]
+    def expand(v):
+        return [((v << n) | (v >> back)) & full for n, back in shifts]
+    return expand
+
+def _expand_xor(params, bits):
+    full = (1 << bits) - 1
+    masks = [m & full for m in params]
+    def expand(v):
+        return [v ^ m for m in masks]
+    return expand
+
+def _expand_rotate(params, bits):
+    if bits % 4:
+        raise ValueError("rotate needs a bit width that is a multiple of 4")
+    ones = int('1' * (bits // 4), 16)
+    high = ones * 0x8
+    low = ones * 0x7
+    addends = [(n % 16) * ones for n in params]
+    def expand(v):
+        # Add to every nibble at once: sum the low three bits, then fold the
+        # top bit back in with XOR so no carry crosses into the next nibble
+        v_low = v & low
+        v_high = v & high
+        return [(v_low + (a & low)) ^ (v_high ^ (a & high)) for a in addends]
+    return expand
+
+STAGES = {
+    'invert': _expand_invert,
+    'reverse': _expand_reverse,
+    'shift': _expand_shift,
+    'xor': _expand_xor,
+    'rotate': _expand_rotate,
+}
+
+# The original string transforms, kept as the reference the integer kernel is checked against
+
+def _reference_invert(params, bits):
+    def expand(v):
+        s = format(v, f'0{bits}b')
+        return [int(inverse(s), 2) if p else v for p in params]
+    return expand
+
+def _reference_reverse(params, bits):
+    def expand(v):
+        s = format(v, f'0{bits}b')
+        return [int(s[::-1], 2) if p else v for p in params]
+    return expand
+
+def _reference_shift(params, bits):
+    def expand(v):
+        s = format(v, f'0{bits}b')
+        return [int(shift_left(s, n), 2) for n in params]
+    return expand
+
+def _reference_rotate(params, bits):
+    if bits % 4:
+        raise ValueError("rotate needs a bit width that is a multiple of 4")
+    def expand(v):
+        out = []
+        for n in params:
+            h = format(v, f'0{bits // 4}x')
+            for _ in range(n % 16):
+                h = rotate_hex(h)
+            out.append(int(h, 16))
+        return out
+    return expand
+
+REFERENCE_STAGES = {
+    'invert': _reference_invert,
+    'reverse': _reference_reverse,
+    'shift': _reference_shift,
+    'xor': _expand_xor,
+    'rotate': _reference_rotate,
+}
+
+class Plan:
+    """A compiled transformation plan"""
+
+    def __init__(self, text=DEFAULT_PLAN_TEXT, reference=False):
+        self.text = text
+        segments = [segment.strip() for segment in text.split('|')]
+        header = dict(item.split('=') for item in segments[0].split())
+        self.bits = int(header.get('bits', '72'), 0)
+        prefix = header.get('prefix', '')
+        self.prefix = int(prefix, 16) << self.bits if prefix else 0
+        self.radius = int(header.get('radius', '0'), 0)
+        if self.radius < 0:
+            raise ValueError("Plan radius must not be negative")
+        # Consecutive keys checked around every candidate, the candidate included
+        self.span = 2 * self.radius + 1
+        if self.bits <= 0 or (self.prefix | ((1 << self.bits) - 1)).bit_length() > 256:
+            raise ValueError("Plan keys must fit in 256 bits")
+
+        stages = REFERENCE_STAGES if reference else STAGES
+        self.stages = []
+        self.expanders = []
+        for segment in segments[1:]:
+            name, _, args = segment.partition(' ')
+            if name not in STAGES:
+                raise ValueError(f"Unknown plan stage: {name!r}")
+            params = _parse_params(args)
+            self.stages.append((name, params))
+            self.expanders.append(stages[name](params, self.bits))
+
+        self.count = 1
+        for name, params in self.stages:
+            self.count *= len(params)
+        # Combinations of every stage but the last, the unit the scan is sharded on
+        self.groups = self.count // len(self.stages[-1][1]) if self.stages else 1
+        self.checked = self.count * self.span
+        # Bytes of the big-endian key that can be non-zero
+        self.key_bytes = ((self.prefix | ((1 << self.bits) - 1)).bit_length() + 7) // 8
+
+    def start_value(self, value):
+        """The top `bits` bits of a value, the input of the first stage"""
+        return value >> max(0, value.bit_length() - self.bits)
+
+    def values(self, value, groups=None):
+        """Every transformed value in plan order, optionally only a slice of groups"""
+        values = [self.start_value(value)]
+        last = len(self.expanders) - 1
+        for i, expand in enumerate(self.expanders):
+            if i == last and groups is not None:
+                values = values[groups]
+            values = [out for v in values for out in expand(v)]
+        return values
+
+    def keys(self, value, groups=None):
+        """Packed buffer of 32 byte big-endian private keys"""
+        prefix = self.prefix
+        return b''.join([(prefix | v).to_bytes(32, 'big') for v in self.values(value, groups)])
+
+    def first_key(self, value):
+        """Key of the first candidate, where every stage takes its first parameter"""
+        v = self.start_value(value)
+        for expand in self.expanders:
+            v = expand(v)[0]
+        return self.prefix | v
+
+    def describe(self):
+        stages = ' x '.join(f'{len(params)} {name}' for name, params in self.stages)
+        if self.radius:
+            stages += f' x {self.span} neighbours'
+        return f'{self.bits} bit values, {stages} = {self.checked:,} keys per value'
+
+def original_keys(value):
+    """Private keys of the explorer's original process_hex_value loop, in its order.
+
+    Kept as the nested string loop it was, so the default plan can be checked
+    against it rather than against stages written in the plan's own order."""
+    size = 72
+    hexSize = size // 4
+    bin2 = bin(value)[2:].zfill(size)[:size]
+    keys = []
+    for inv in range(2):
+        for z in range(2):
+            for y in range(size):
+                pp = int(bin2, 2)
+                hex2 = hex(pp)[2:].zfill(hexSize)
+                for x in range(16):
+                    keys.append(int('1' + hex2, 16))
+                    hex2 = rotate_hex(hex2)
+                bin2 = shift_left(bin2, 1)
+            bin2 = bin2[::-1]
+        bin2 = inverse(bin2)
+    return keys
+
+def check_kernel(plan, samples=64, seed=None):
+    """Compare the plan's integer kernel with the string reference on random values.
+
+    A plan with the default header and stages also has its keys compared, in
+    order, with original_keys. Returns the list of sample values whose
+    candidate sequences differ."""
+    reference = Plan(plan.text, reference=True)
+    default = Plan(DEFAULT_PLAN_TEXT)
+    original = (plan.bits, plan.prefix, plan.stages) == (default.bits, default.prefix, default.stages)
+    rng = random.Random(seed)
+    full = (1 << plan.bits) - 1
+    values = [0, full, 1, 1 << (plan.bits - 1)]
+    values += [rng.getrandbits(plan.bits) for _ in range(samples)]
+    mismatches = []
+    for v in values:
+        if plan.values(v) != reference.values(v):
+            mismatches.append(v)
+        elif original:
+            keys = plan.keys(v)
+            if [int.from_bytes(keys[i:i + 32], 'big') for i in range(0, len(keys), 32)] != original_keys(v):
+                mismatches.append(v)
+    return mismatches
+
+def estimate(plan, hash_keys, sample_value=None, repeat=3):
+    """Planner report: keys checked per value and keys/s measured on a sample value.
+
+    hash_keys is the EC stage to time together with generation, so the
+    estimate covers the whole per-key cost."""
+    if sample_value is None:
+        sample_value = (1 << plan.bits) - 1
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hash_keys(plan.keys(sample_value))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    keys_per_second = plan.checked / best if best else 0.0
+    return plan.checked, keys_per_second
@@ -0,0 +1,215 @@
+import math
+from collections import OrderedDict
+from viewport import FRAC_BITS, ONE
+
+# Tk's gray30, the colour of the grid lines drawn at high zoom
+GRID_COLOR = '#4d4d4d'
+
+def hsv_to_rgb(h, s, v):
+    """Convert HSV to RGB"""
+    h = h / 360.0
+    i = int(h * 6)
+    f = h * 6 - i
+    p = v * (1 - s)
+    q = v * (1 - f * s)
+    t = v * (1 - (1 - f) * s)
+
+    i = i % 6
+    if i == 0:
+        r, g, b = v, t, p
+    elif i == 1:
+        r, g, b = q, v, p
+    elif i == 2:
+        r, g, b = p, v, t
+    elif i == 3:
+        r, g, b = p, q, v
+    elif i == 4:
+        r, g, b = t, p, v
+    else:
+        r, g, b = v, p, q
+
+    return int(r * 255), int(g * 255), int(b * 255)
+
+def color_for_value(viewport, value, zoom_level):
+    """Get color based on value and zoom level"""
+    # At high zoom levels, show bit patterns
+    if zoom_level > 1000000:
+        # Show individual bits as alternating patterns
+        bit_pattern = value & 0xFF  # Look at lower 8 bits
+        brightness = 50 + (bit_pattern * 205 // 255)
+
+        # Create patterns based on bit positions
+        r = brightness if (value & 0x1) else brightness // 2
+        g = brightness if (value & 0x10) else brightness // 2
+        b = brightness if (value & 0x100) else brightness // 2
+
+    # At medium zoom levels, show byte boundaries
+    elif zoom_level > 10000:
+        # Color based on byte values
+        byte_val = (value >> 8) & 0xFF
+        hue = (byte_val / 255.0) * 360
+        r, g, b = hsv_to_rgb(hue, 0.8, 0.9)
+
+    # At low zoom levels, show smooth gradient
+    else:
+        # Normalize value to 0-1 range
+        norm_value = (value - viewport.range_start) / viewport.range_size
+
+        # Smooth gradient with multiple color stops
+        if norm_value < 0.25:
+            # Blue to Cyan
+            r = 0
+            g = int(255 * (norm_value * 4))
+            b = 255
+        elif norm_value < 0.5:
+            # Cyan to Green
+            r = 0
+            g = 255
+            b = int(255 * (1 - (norm_value - 0.25) * 4))
+        elif norm_value < 0.75:
+            # Green to Yellow
+            r = int(255 * ((norm_value - 0.5) * 4))
+            g = 255
+            b = 0
+        else:
+            # Yellow to Red
+            r = 255
+            g = int(255 * (1 - (norm_value - 0.75) * 4))
+            b = 0
+
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+def column_step(viewport, width):
+    """Columns sharing one colour: coarser when zoomed out, where neighbours look alike"""
+    if viewport.size_fp > 100000 * width * ONE:
+        return 4
+    if viewport.size_fp > 1000 * width * ONE:
+        return 2
+    return 1
+
+def grid_columns(viewport, width):
+    """Columns of the hex grid lines shown at high zoom"""
+    # Calculate appropriate grid spacing
+    grid_spacing = 1
+    while (grid_spacing * 20) << FRAC_BITS < viewport.size_fp:
+        grid_spacing *= 16  # Hex-based spacing
+
+    # Find first grid line
+    start_grid = (viewport.start_fp // (grid_spacing << FRAC_BITS)) * grid_spacing
+
+    end_fp = viewport.end_fp
+    columns = []
+    for i in range(50):  # Limit iterations
+        grid_value = start_grid + i * grid_spacing
+        if grid_value << FRAC_BITS > end_fp:
+            break
+        x = viewport.column_at(grid_value)
+        if 0 <= x < width:
+            columns.append(x)
+    return columns
+
+def render_row(viewport, width):
+    """One '#rrggbb' colour per canvas column for the current viewport.
+
+    Every row of the display is the same, so this is the whole picture; the
+    explorer tiles it over its PhotoImage."""
+    zoom_level = viewport.zoom_level()
+    step = column_step(viewport, width)
+    start = viewport.start_fp * width
+    size_fp = viewport.size_fp
+    denominator = width << FRAC_BITS
+
+    row = []
+    for x in range(0, width, step):
+        value = (start + x * size_fp) // denominator
+        row.extend([color_for_value(viewport, value, zoom_level)] * min(step, width - x))
+
+    # Draw grid lines at high zoom levels
+    if zoom_level > 100000:
+        for x in grid_columns(viewport, width):
+            row[x] = GRID_COLOR
+    return row
+
+def photo_row(row):
+    """A row of colours in the data format of PhotoImage.put"""
+    return '{' + ' '.join(row) + '}'
+
+class TileCache:
+    """Rendered colour strips for fixed-width slices of the range, reused across frames.
+
+    The scale, in values per pixel, is quantised to levels an eighth of an
+    octave apart. A tile holds TILE_WIDTH columns of one level, keyed by
+    (level, tile index), so panning and zooming back and forth revisit tiles
+    that are already rendered. A frame samples the finest level that is
+    not coarser than its own scale, so no column is off by more than one
+    pixel. The least recently used tiles are evicted once the memory budget
+    is reached."""
+
+    TILE_WIDTH = 64
+    LEVELS_PER_OCTAVE = 8
+    # Level scales are fixed-point with this many fraction bits
+    SCALE_BITS = 32
+    # Rough size of one cached column: a tuple slot and a 7 character string
+    COLUMN_BYTES = 64
+
+    def __init__(self, width, max_bytes=32 * 1024 * 1024):
+        self.width = width
+        self.max_tiles = max(1, max_bytes // (self.TILE_WIDTH * self.COLUMN_BYTES))
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def level_scale(self, level):
+        """Values per pixel of a level, times 2 ** SCALE_BITS"""
+        return max(1, int(2 ** (level / self.LEVELS_PER_OCTAVE) * 2 ** self.SCALE_BITS))
+
+    def level_for(self, viewport):
+        """Finest level whose scale is not coarser than the viewport's values per pixel"""
+        level = math.floor(math.log2(viewport.values_per_pixel()) * self.LEVELS_PER_OCTAVE)
+        while (self.level_scale(level) << (FRAC_BITS - self.SCALE_BITS)) * self.width > viewport.size_fp:
+            level -= 1
+        return level
+
+    def tile(self, viewport, level, index):
+        key = (level, index)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.hits += 1
+            self.tiles.move_to_end(key)
+            return tile
+
+        self.misses += 1
+        scale = self.level_scale(level)
+        zoom_level = (viewport.range_size << self.SCALE_BITS) / (scale * self.width)
+        first = index * self.TILE_WIDTH
+        tile = tuple(color_for_value(viewport, viewport.range_start + ((first + c) * scale >> self.SCALE_BITS),
+                                     zoom_level)
+                     for c in range(self.TILE_WIDTH))
+        self.tiles[key] = tile
+        if len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def render_row(self, viewport):
+        """render_row() assembled from cached tiles"""
+        width = self.width
+        level = self.level_for(viewport)
+        # Level scale in the viewport's fixed point, times the width like the positions
+        scale = (self.level_scale(level) << (FRAC_BITS - self.SCALE_BITS)) * width
+        origin = (viewport.start_fp - viewport.range_start_fp) * width
+        size_fp = viewport.size_fp
+
+        tile_width = self.TILE_WIDTH
+        row = []
+        tile_index = None
+        for x in range(width):
+            column = (origin + x * size_fp) // scale
+            if column // tile_width != tile_index:
+                tile_index = column // tile_width
+                tile = self.tile(viewport, level, tile_index)
+            row.append(tile[column % tile_width])
+
+        if viewport.zoom_level() > 100000:
+            for x in grid_columns(viewport, width):
+                row[x] = GRID_COLOR
+        return row
@@ -0,0 +1,353 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+import secp256k1 as ice
+from keycache import KEY_BYTES
+from plans import Plan
+from vectorgen import BatchGenerator
+from metrics import METRICS, Metrics
+
+# Puzzle #73
+PUZZLE_TARGET = '12VVRNPi4SJqUTsp6FmqDqY5sGosDtysn4'
+PUZZLE_RANGE_START = 0x1000000000000000000
+PUZZLE_RANGE_END = 0x1ffffffffffffffffff
+
+# Family of candidates every value is expanded into, see plans.py
+DEFAULT_PLAN = Plan()
+
+def generate_candidates(value, plan=DEFAULT_PLAN, groups=None):
+    """Stage 1: expand a value into one packed buffer of 32 byte big-endian keys"""
+    return plan.keys(value, groups)
+
+# Compiled batch generators, one per plan text
+_batch_generators = {}
+
+def generate_batch(values, plan=DEFAULT_PLAN, groups=None):
+    """Stage 1 for many values at once, vectorized when NumPy is available"""
+    generator = _batch_generators.get(plan.text)
+    if generator is None:
+        generator = _batch_generators[plan.text] = BatchGenerator(plan)
+    return generator.keys(values, groups)
+
+def hash_candidates(keys, radius=0, metrics=None):
+    """Stage 2: turn a packed key buffer into packed compressed hash160s.
+
+    With a radius, every key is replaced by the 2 * radius + 1 consecutive keys
+    centred on it. privatekey_loop_h160_sse does one scalar multiplication for
+    the first of them and steps through the rest by point addition; the
+    library hashes them too, so that time is all counted as 'ec'."""
+    started = time.perf_counter()
+    if radius:
+        span = 2 * radius + 1
+        loop = ice.privatekey_loop_h160_sse
+        hashes = b''.join([loop(span, 0, True, int.from_bytes(keys[i:i + 32], 'big') - radius)
+                           for i in range(0, len(keys), 32)])
+        if metrics is not None:
+            metrics.observe('ec', time.perf_counter() - started)
+        return hashes
+    pubkeys = ice.scalar_multiplications_packed(keys)
+    multiplied = time.perf_counter()
+    hashes = ice.pubkeys_to_h160(0, True, pubkeys)
+    if metrics is not None:
+        metrics.observe('ec', multiplied - started)
+        metrics.observe('hash', time.perf_counter() - multiplied)
+    return hashes
+
+def drop_seen(keys, cache, key_bytes=KEY_BYTES):
+    """Cache stage: remove the keys a seen-key cache has already checked"""
+    return cache.drop_seen(keys, key_bytes)
+
+def key_at(keys, index, radius=0):
+    """Private key of the index-th hash160 that hash_candidates(keys, radius) returned"""
+    candidate, offset = divmod(index, 2 * radius + 1)
+    return int.from_bytes(keys[32 * candidate:32 * candidate + 32], 'big') + offset - radius
+
+def check_keys(keys, targets, cache, plan, metrics):
+    """Cache, EC and compare stages for a generated key buffer.
+
+    Returns the keys left after the cache, their hash160s and the index of
+    the first hash160 that is a target, or None."""
+    if cache is not None:
+        started = time.perf_counter()
+        keys = drop_seen(keys, cache, plan.key_bytes)
+        metrics.observe('cache', time.perf_counter() - started)
+    hashes = hash_candidates(keys, plan.radius, metrics)
+
+    # Stage 3: one lookup per candidate against every target
+    started = time.perf_counter()
+    index = targets.find(hashes)
+    metrics.observe('compare', time.perf_counter() - started)
+    metrics.count('keys', len(hashes) // 20)
+    return keys, hashes, index
+
+def timed_generate(generate, metrics, *args):
+    started = time.perf_counter()
+    keys = generate(*args)
+    metrics.observe('generate', time.perf_counter() - started)
+    return keys
+
+def log_value(value, address, plan=DEFAULT_PLAN):
+    bits = format(plan.start_value(value), f'0{plan.bits}b')
+    print(bits + ' - ' + hex(plan.first_key(value))[2:] + ' -> ' + address)
+
+def scan_value(value, targets, cache=None, plan=DEFAULT_PLAN, metrics=METRICS):
+    """Run all stages for one value. Returns the matching private key or None"""
+    keys = timed_generate(generate_candidates, metrics, value, plan)
+    first = keys[:32]
+    keys, hashes, index = check_keys(keys, targets, cache, plan, metrics)
+    metrics.count('values')
+
+    # Base58 is only built for the logged line and for real hits
+    if keys[:32] == first:
+        first_hash = 20 * plan.radius
+        address = ice.hash_to_address(0, True, hashes[first_hash:first_hash + 20])
+    else:
+        address = ice.privatekey_to_address(0, True, plan.first_key(value))
+    log_value(value, address, plan)
+
+    if index is None:
+        return None
+    return key_at(keys, index, plan.radius)
+
+def scan_values(values, targets, cache=None, plan=DEFAULT_PLAN, metrics=METRICS):
+    """scan_value() for a batch of values, generated in one call. Returns the matching key or None"""
+    keys = timed_generate(generate_batch, metrics, values, plan)
+    generated = len(keys)
+    keys, hashes, index = check_keys(keys, targets, cache, plan, metrics)
+    metrics.count('values', len(values))
+
+    stride = plan.checked * 20
+    first_hash = 20 * plan.radius
+    for i, value in enumerate(values):
+        if len(keys) == generated:
+            address = ice.hash_to_address(0, True, hashes[i * stride + first_hash:i * stride + first_hash + 20])
+        else:
+            address = ice.privatekey_to_address(0, True, plan.first_key(value))
+        log_value(value, address, plan)
+
+    if index is None:
+        return None
+    return key_at(keys, index, plan.radius)
+
+def record_found(pvk):
+    address = ice.privatekey_to_address(0, True, pvk)
+    print(hex(pvk)[2:] + ' -> ' + address)
+    print('found')
+    with open('found.txt', 'a') as file:
+        file.write(hex(pvk)[2:] + ' -> ' + address + "\n")
+
+# Per-process state of the parallel scan pool, set once by _init_pool_worker
+_pool_targets = None
+_pool_found = None
+_pool_cache = None
+_pool_plan = None
+
+def _init_pool_worker(targets, found, cache, plan_text):
+    # Forked processes inherit the secp256k1 tables, spawned ones build them on first use
+    global _pool_targets, _pool_found, _pool_cache, _pool_plan
+    _pool_targets = targets
+    _pool_targets.load()
+    _pool_found = found
+    _pool_cache = cache
+    # Plans hold compiled closures, so every process compiles its own copy
+    _pool_plan = Plan(plan_text)
+
+def _scan_generated(keys, metrics):
+    generated = len(keys)
+    keys, hashes, index = check_keys(keys, _pool_targets, _pool_cache, _pool_plan, metrics)
+    skipped = (generated - len(keys)) // 32
+    if index is None:
+        return None, skipped, metrics
+    _pool_found.set()
+    return key_at(keys, index, _pool_plan.radius), skipped, metrics
+
+def _scan_shards(value, groups):
+    """Returns the matching key or None, the number of keys skipped as already
+    seen and the stage metrics of this call, merged by the parent"""
+    metrics = Metrics()
+    if _pool_found.is_set():
+        return None, 0, metrics
+    return _scan_generated(timed_generate(generate_candidates, metrics, value, _pool_plan, groups), metrics)
+
+def _scan_batch(values):
+    """_scan_shards() for whole values, used when scanning in batches"""
+    metrics = Metrics()
+    if _pool_found.is_set():
+        return None, 0, metrics
+    return _scan_generated(timed_generate(generate_batch, metrics, values, _pool_plan), metrics)
+
+class ParallelScanner:
+    """Scans one value at a time by sharding its plan groups (the (inverse,
+    reverse, shift) space for the default plan) across a process pool. A
+    shared event stops every process once one of them hits.
+
+    Every process gets its own copy of the seen-key cache, so its memory cap
+    applies per process."""
+
+    def __init__(self, targets, processes=None, cache=None, plan=DEFAULT_PLAN, metrics=METRICS):
+        self.processes = processes or os.cpu_count()
+        self.plan = plan
+        self.metrics = metrics
+        self.found = multiprocessing.Event()
+        # Built once here instead of in every forked process
+        ice.prepare()
+        self.pool = multiprocessing.Pool(self.processes, initializer=_init_pool_worker,
+                                         initargs=(targets, self.found, cache, plan.text))
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # A few shards per process keeps every core busy until the last one finishes
+        step = max(1, plan.groups // (self.processes * 4))
+        self.shards = [slice(i, i + step) for i in range(0, plan.groups, step)]
+
+    def scan_value(self, value):
+        """Same contract as scan_value(): the matching private key or None"""
+        log_value(value, ice.privatekey_to_address(0, True, self.plan.first_key(value)), self.plan)
+        if self.found.is_set():
+            return None
+        results = self.pool.starmap(_scan_shards, [(value, shards) for shards in self.shards])
+        self.metrics.count('values')
+        return self._collect(results, 1)
+
+    def scan_values(self, values):
+        """Same contract as scan_values(): batches are split by value rather than by plan group"""
+        for value in values:
+            log_value(value, ice.privatekey_to_address(0, True, self.plan.first_key(value)), self.plan)
+        if self.found.is_set():
+            return None
+        step = max(1, -(-len(values) // self.processes))
+        chunks = [(values[i:i + step],) for i in range(0, len(values), step)]
+        results = self.pool.starmap(_scan_batch, chunks)
+        self.metrics.count('values', len(values))
+        return self._collect(results, len(values))
+
+    def _collect(self, results, values):
+        skipped = 0
+        found = None
+        for pvk, shard_skipped, metrics in results:
+            skipped += shard_skipped
+            self.metrics.merge(metrics)
+            if pvk is not None and found is None:
+                found = pvk
+        self.cache_hits += skipped
+        self.cache_misses += self.plan.count * values - skipped
+        return found
+
+    def close(self):
+        self.pool.terminate()
+
+class ScanWorker:
+    """Scans values on a background thread so the caller never blocks on key checking.
+
+    The job queue is bounded: submitting a new value drops any stale value that
+    has not been picked up yet. Hits are written to found.txt from the worker and
+    reported through a result queue that the caller polls.
+
+    With a CoverageIndex, values it has already recorded are skipped and every
+    scanned value is added to it, flushed to disk once a minute. An exception
+    stops the worker, is kept in error and the pool and index are still closed."""
+
+    def __init__(self, targets, max_pending=1, processes=1, cache=None, plan=DEFAULT_PLAN,
+                 coverage=None, metrics=METRICS):
+        self.targets = targets
+        self.cache = cache
+        self.plan = plan
+        self.metrics = metrics
+        self.coverage = coverage
+        self.skipped_covered = 0
+        # The exception that ended the worker, if one did
+        self.error = None
+        # More than one process shards every value across a ParallelScanner pool
+        self.parallel = ParallelScanner(targets, processes, cache, plan, metrics) if processes > 1 else None
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.results = queue.Queue()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, value):
+        """Queue a value for scanning, superseding the oldest pending one"""
+        if self.stopped.is_set():
+            return
+        while True:
+            try:
+                self.jobs.put_nowait(value)
+                self.metrics.gauge('queue', self.jobs.qsize())
+                return
+            except queue.Full:
+                try:
+                    self.jobs.get_nowait()
+                    self.metrics.count('superseded')
+                except queue.Empty:
+                    pass
+
+    def poll(self):
+        """Return the keys found since the last poll without blocking"""
+        found = []
+        while True:
+            try:
+                found.append(self.results.get_nowait())
+            except queue.Empty:
+                return found
+
+    def cache_stats(self):
+        """(hits, misses) of the seen-key cache, summed over pool processes in parallel mode"""
+        if self.parallel is not None:
+            return self.parallel.cache_hits, self.parallel.cache_misses
+        if self.cache is not None:
+            return self.cache.hits, self.cache.misses
+        return 0, 0
+
+    def stop(self):
+        """Stop the worker once the value it is scanning is done"""
+        self.stopped.set()
+        try:
+            # Wake the worker up so it notices it has been stopped
+            self.jobs.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        try:
+            self._scan_jobs()
+        except Exception as e:
+            # The caller sees the worker is dead and why, and submit() stops queueing
+            self.error = e
+            self.stopped.set()
+            print(f'[-] Scan worker stopped by {e!r}')
+            traceback.print_exc()
+        finally:
+            if self.parallel is not None:
+                self.parallel.close()
+            if self.coverage is not None:
+                self.coverage.close()
+
+    def _scan_jobs(self):
+        # The secp256k1 tables are built here, off the caller's thread, before the first value
+        ice.prepare()
+        flushed = time.monotonic()
+        while not self.stopped.is_set():
+            value = self.jobs.get()
+            if value is None:
+                continue
+            if self.coverage is not None and self.coverage.covered(value):
+                self.skipped_covered += 1
+                continue
+            if self.parallel is not None:
+                pvk = self.parallel.scan_value(value)
+            else:
+                pvk = scan_value(value, self.targets, self.cache, self.plan, self.metrics)
+            # Recorded only once scanned, so a value cut short by stop() is not skipped next time
+            if self.coverage is not None:
+                self.coverage.add(value)
+                if time.monotonic() - flushed > 60:
+                    self.coverage.flush()
+                    flushed = time.monotonic()
+            self.metrics.gauge('queue', self.jobs.qsize())
+            if pvk is not None:
+                # A hit ends the search
+                record_found(pvk)
+                self.stopped.set()
+                self.results.put(pvk)
@@ -4,33 +4,66 @@
 @author: iceland
 """
 
-import platform
 import os
 import sys
 import ctypes
+import binascii
+import heapq
 import math
+import mmap
 import pickle
+import struct
+import tempfile
+import threading
 
 ###############################################################################
 N = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
 Zero=b'\x04\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
 #==============================================================================
-if platform.system().lower().startswith('win'):
+class _Library:
+    ''' ice_secp256k1, loaded on first use. A function gets its argtypes and restype when it is
+    first looked up, and the precomputed tables of init_secp256_lib are built before the first
+    function that needs them, so importing this module costs next to nothing '''
+
+    def __init__(self, path):
+        self._path = path
+        self._dll = None
+        self._tables = False
+        self._lock = threading.Lock()
+
+    def load(self, tables=True):
+        ''' Load the library, and build its tables unless tables is False '''
+        with self._lock:
+            if self._dll is None:
+                self._dll = ctypes.CDLL(self._path)
+            if tables and not self._tables:
+                self._dll.init_secp256_lib()
+                self._tables = True
+        return self._dll
+
+    def __getattr__(self, name):
+        func = getattr(self.load(name not in _NO_TABLES), name)
+        if name in _ARGTYPES: func.argtypes = _ARGTYPES[name]
+        if name in _RESTYPES: func.restype = _RESTYPES[name]
+        setattr(self, name, func)
+        return func
+
+if sys.platform.startswith('win'):
     dir_path = os.path.dirname(os.path.realpath(__file__))
     
     dllfile = dir_path + '/ice_secp256k1.dll'
     if os.path.isfile(dllfile) == True:
         pathdll = os.path.realpath(dllfile)
-        ice = ctypes.CDLL(pathdll)
+        ice = _Library(pathdll)
     else:
         print('File {} not found'.format(dllfile))
     
-elif platform.system().lower().startswith('lin'):
+elif sys.platform.startswith('lin'):
     dir_path = os.path.dirname(os.path.realpath(__file__))
     dllfile = dir_path + '/ice_secp256k1.so'
     if os.path.isfile(dllfile) == True:
         pathdll = os.path.realpath(dllfile)
-        ice = ctypes.CDLL(pathdll)
+        ice = _Library(pathdll)
     else:
         print('File {} not found'.format(dllfile))
     
@@ -92,117 +125,76 @@ COIN_DNR  =	48
 COIN_BWK  =	49
 
 #==============================================================================
-ice.scalar_multiplication.argtypes = [ctypes.c_char_p, ctypes.c_char_p]   # pvk,ret
-#==============================================================================
-ice.scalar_multiplications.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]  # pvk,len,ret
-#==============================================================================
-ice.get_x_to_y.argtypes = [ctypes.c_char_p, ctypes.c_bool, ctypes.c_char_p]   # x,even,ret
-#==============================================================================
-ice.point_increment.argtypes = [ctypes.c_char_p, ctypes.c_char_p] # upub,ret
-#==============================================================================
-ice.point_negation.argtypes = [ctypes.c_char_p, ctypes.c_char_p]  # upub,ret
-#==============================================================================
-ice.point_doubling.argtypes = [ctypes.c_char_p, ctypes.c_char_p]  # upub,ret
-#==============================================================================
-ice.privatekey_to_coinaddress.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_bool, ctypes.c_char_p]  # intcoin,012,comp,pvk
-ice.privatekey_to_coinaddress.restype = ctypes.c_void_p
-#==============================================================================
-ice.privatekey_to_address.argtypes = [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p]  # 012,comp,pvk
-ice.privatekey_to_address.restype = ctypes.c_void_p
-#==============================================================================
-ice.hash_to_address.argtypes = [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p]  # 012,comp,hash
-ice.hash_to_address.restype = ctypes.c_void_p
-#==============================================================================
-ice.pubkey_to_address.argtypes = [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p]  # 012,comp,upub
-ice.pubkey_to_address.restype = ctypes.c_void_p
-#==============================================================================
-ice.privatekey_to_h160.argtypes = [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p, ctypes.c_char_p]  # 012,comp,pvk,ret
-#==============================================================================
-ice.privatekey_loop_h160.argtypes = [ctypes.c_ulonglong, ctypes.c_int, ctypes.c_bool, ctypes.c_char_p, ctypes.c_char_p]  # num,012,comp,pvk,ret
-#==============================================================================
-ice.privatekey_loop_h160_sse.argtypes = [ctypes.c_ulonglong, ctypes.c_int, ctypes.c_bool, ctypes.c_char_p, ctypes.c_char_p]  # num,012,comp,pvk,ret
-#==============================================================================
-ice.pubkey_to_h160.argtypes = [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p, ctypes.c_char_p]  # 012,comp,upub,ret
-#==============================================================================
-ice.pbkdf2_hmac_sha512_dll.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int] # ret, words, len
-#==============================================================================
-ice.pbkdf2_hmac_sha512_list.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulonglong, ctypes.c_int, ctypes.c_ulonglong] # ret,words,len,mnem_size,total 
-#==============================================================================
-ice.pub_endo1.argtypes = [ctypes.c_char_p, ctypes.c_char_p]  # upub,ret
-#==============================================================================
-ice.pub_endo2.argtypes = [ctypes.c_char_p, ctypes.c_char_p]  # upub,ret
-#==============================================================================
-ice.b58_encode.argtypes = [ctypes.c_char_p]  # _h
-ice.b58_encode.restype = ctypes.c_void_p
-#==============================================================================
-ice.b58_decode.argtypes = [ctypes.c_char_p]  # addr
-ice.b58_decode.restype = ctypes.c_void_p
-#==============================================================================
-ice.bech32_address_decode.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p]  # coin,b32_addr,h160
-#==============================================================================
-ice.get_sha256.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p] # input, len, ret
-#==============================================================================
-ice.create_baby_table.argtypes = [ctypes.c_ulonglong, ctypes.c_ulonglong, ctypes.c_char_p] # start,end,ret
-#==============================================================================
-ice.point_addition.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p] # upub1,upub2,ret
-#==============================================================================
-ice.point_subtraction.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p] # upub1,upub2,ret
-#==============================================================================
-ice.point_loop_subtraction.argtypes = [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p] # k,upub1,upub2,ret
-#==============================================================================
-ice.point_loop_addition.argtypes = [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p] # k,upub1,upub2,ret
-#==============================================================================
-ice.point_vector_addition.argtypes = [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p] # num,upubs1,upubs2,ret
-#==============================================================================
-ice.point_sequential_increment_P2.argtypes = [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p] # num,upub1,ret
-#==============================================================================
-ice.point_sequential_increment_P2_mcpu.argtypes = [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p] # num,upub1,mcpu,ret
-#==============================================================================
-ice.point_sequential_increment.argtypes = [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p] # num,upub1,ret
-#==============================================================================
-ice.point_sequential_decrement.argtypes = [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p] # num,upub1,ret
-#==============================================================================
-ice.pubkeyxy_to_ETH_address.argtypes = [ctypes.c_char_p] # upub_xy
-ice.pubkeyxy_to_ETH_address.restype = ctypes.c_void_p
-#==============================================================================
-ice.pubkeyxy_to_ETH_address_bytes.argtypes = [ctypes.c_char_p, ctypes.c_char_p] # upub_xy, ret
-#==============================================================================
-ice.privatekey_to_ETH_address.argtypes = [ctypes.c_char_p] # pvk
-ice.privatekey_to_ETH_address.restype = ctypes.c_void_p
-#==============================================================================
-ice.privatekey_to_ETH_address_bytes.argtypes = [ctypes.c_char_p, ctypes.c_char_p] # pvk, ret
-#==============================================================================
-ice.privatekey_group_to_ETH_address.argtypes = [ctypes.c_char_p, ctypes.c_int] # pvk, m
-ice.privatekey_group_to_ETH_address.restype = ctypes.c_void_p
-#==============================================================================
-ice.privatekey_group_to_ETH_address_bytes.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p] # pvk,m,ret
-#==============================================================================
-ice.init_P2_Group.argtypes = [ctypes.c_char_p] # upub
-#==============================================================================
-ice.free_memory.argtypes = [ctypes.c_void_p] # pointer
-#==============================================================================
-ice.bloom_check_add.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_ulonglong, ctypes.c_ubyte, ctypes.c_char_p] #buff, len, 0_1, _bits, _hashes, _bf
-ice.bloom_check_add.restype = ctypes.c_int
-#==============================================================================
-ice.bloom_batch_add.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_ulonglong, ctypes.c_ubyte, ctypes.c_char_p] #chunk, buff, len, 0_1, _bits, _hashes, _bf
-#==============================================================================
-ice.bloom_check_add_mcpu.argtypes = [ctypes.c_void_p, ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_ulonglong, ctypes.c_ubyte, ctypes.c_char_p] #buff, num_items, found_array, len, mcpu, 0_1, _bits, _hashes, _bf
-#==============================================================================
-ice.test_bit_set_bit.argtypes = [ctypes.c_char_p, ctypes.c_ulonglong, ctypes.c_int] #_bf, _bits, 0_1
-#==============================================================================
-ice.create_bsgs_bloom_mcpu.argtypes = [ctypes.c_int, ctypes.c_ulonglong, ctypes.c_ulonglong, ctypes.c_ubyte, ctypes.c_char_p] #mcpu, num_items, _bits, _hashes, _bf
-#==============================================================================
-ice.bsgs_2nd_check_prepare.argtypes = [ctypes.c_ulonglong] # bP_elem
-#==============================================================================
-ice.bsgs_2nd_check.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulonglong, ctypes.c_char_p] # upub, z1, bP_elem, ret
-ice.bsgs_2nd_check.restype = ctypes.c_bool #True or False
-#==============================================================================
-ice.Load_data_to_memory.argtypes = [ctypes.c_char_p, ctypes.c_bool] #sorted_bin_file_h160, verbose
-#==============================================================================
-ice.check_collision.argtypes = [ctypes.c_char_p] #h160
-ice.check_collision.restype = ctypes.c_bool #True or False
-
-ice.init_secp256_lib()
+# Argument and result types of the library functions, set when a function is first used
+_ARGTYPES = {
+    'scalar_multiplication': [ctypes.c_char_p, ctypes.c_char_p],  # pvk,ret
+    'scalar_multiplications': [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p],  # pvk,len,ret
+    'get_x_to_y': [ctypes.c_char_p, ctypes.c_bool, ctypes.c_char_p],  # x,even,ret
+    'point_increment': [ctypes.c_char_p, ctypes.c_char_p],  # upub,ret
+    'point_negation': [ctypes.c_char_p, ctypes.c_char_p],  # upub,ret
+    'point_doubling': [ctypes.c_char_p, ctypes.c_char_p],  # upub,ret
+    'privatekey_to_coinaddress': [ctypes.c_int, ctypes.c_int, ctypes.c_bool, ctypes.c_char_p],  # intcoin,012,comp,pvk
+    'privatekey_to_address': [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p],  # 012,comp,pvk
+    'hash_to_address': [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p],  # 012,comp,hash
+    'pubkey_to_address': [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p],  # 012,comp,upub
+    'privatekey_to_h160': [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p, ctypes.c_char_p],  # 012,comp,pvk,ret
+    'privatekey_loop_h160': [ctypes.c_ulonglong, ctypes.c_int, ctypes.c_bool, ctypes.c_char_p, ctypes.c_char_p],  # num,012,comp,pvk,ret
+    'privatekey_loop_h160_sse': [ctypes.c_ulonglong, ctypes.c_int, ctypes.c_bool, ctypes.c_char_p, ctypes.c_char_p],  # num,012,comp,pvk,ret
+    'pubkey_to_h160': [ctypes.c_int, ctypes.c_bool, ctypes.c_char_p, ctypes.c_char_p],  # 012,comp,upub,ret
+    'pbkdf2_hmac_sha512_dll': [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int],  # ret, words, len
+    'pbkdf2_hmac_sha512_list': [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulonglong, ctypes.c_int, ctypes.c_ulonglong],  # ret,words,len,mnem_size,total 
+    'pub_endo1': [ctypes.c_char_p, ctypes.c_char_p],  # upub,ret
+    'pub_endo2': [ctypes.c_char_p, ctypes.c_char_p],  # upub,ret
+    'b58_encode': [ctypes.c_char_p],  # _h
+    'b58_decode': [ctypes.c_char_p],  # addr
+    'bech32_address_decode': [ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p],  # coin,b32_addr,h160
+    'get_sha256': [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p],  # input, len, ret
+    'create_baby_table': [ctypes.c_ulonglong, ctypes.c_ulonglong, ctypes.c_char_p],  # start,end,ret
+    'point_addition': [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p],  # upub1,upub2,ret
+    'point_subtraction': [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p],  # upub1,upub2,ret
+    'point_loop_subtraction': [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p],  # k,upub1,upub2,ret
+    'point_loop_addition': [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p],  # k,upub1,upub2,ret
+    'point_vector_addition': [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p],  # num,upubs1,upubs2,ret
+    'point_sequential_increment_P2': [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p],  # num,upub1,ret
+    'point_sequential_increment_P2_mcpu': [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p],  # num,upub1,mcpu,ret
+    'point_sequential_increment': [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p],  # num,upub1,ret
+    'point_sequential_decrement': [ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_char_p],  # num,upub1,ret
+    'pubkeyxy_to_ETH_address': [ctypes.c_char_p],  # upub_xy
+    'pubkeyxy_to_ETH_address_bytes': [ctypes.c_char_p, ctypes.c_char_p],  # upub_xy, ret
+    'privatekey_to_ETH_address': [ctypes.c_char_p],  # pvk
+    'privatekey_to_ETH_address_bytes': [ctypes.c_char_p, ctypes.c_char_p],  # pvk, ret
+    'privatekey_group_to_ETH_address': [ctypes.c_char_p, ctypes.c_int],  # pvk, m
+    'privatekey_group_to_ETH_address_bytes': [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p],  # pvk,m,ret
+    'init_P2_Group': [ctypes.c_char_p],  # upub
+    'free_memory': [ctypes.c_void_p],  # pointer
+    'bloom_check_add': [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_ulonglong, ctypes.c_ubyte, ctypes.c_char_p],  #buff, len, 0_1, _bits, _hashes, _bf
+    'bloom_batch_add': [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_ulonglong, ctypes.c_ubyte, ctypes.c_char_p],  #chunk, buff, len, 0_1, _bits, _hashes, _bf
+    'bloom_check_add_mcpu': [ctypes.c_void_p, ctypes.c_ulonglong, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_ulonglong, ctypes.c_ubyte, ctypes.c_char_p],  #buff, num_items, found_array, len, mcpu, 0_1, _bits, _hashes, _bf
+    'test_bit_set_bit': [ctypes.c_char_p, ctypes.c_ulonglong, ctypes.c_int],  #_bf, _bits, 0_1
+    'create_bsgs_bloom_mcpu': [ctypes.c_int, ctypes.c_ulonglong, ctypes.c_ulonglong, ctypes.c_ubyte, ctypes.c_char_p],  #mcpu, num_items, _bits, _hashes, _bf
+    'bsgs_2nd_check_prepare': [ctypes.c_ulonglong],  # bP_elem
+    'bsgs_2nd_check': [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulonglong, ctypes.c_char_p],  # upub, z1, bP_elem, ret
+    'Load_data_to_memory': [ctypes.c_char_p, ctypes.c_bool],  #sorted_bin_file_h160, verbose
+    'check_collision': [ctypes.c_char_p],  #h160
+}
+_RESTYPES = {
+    'privatekey_to_coinaddress': ctypes.c_void_p,
+    'privatekey_to_address': ctypes.c_void_p,
+    'hash_to_address': ctypes.c_void_p,
+    'pubkey_to_address': ctypes.c_void_p,
+    'b58_encode': ctypes.c_void_p,
+    'b58_decode': ctypes.c_void_p,
+    'pubkeyxy_to_ETH_address': ctypes.c_void_p,
+    'privatekey_to_ETH_address': ctypes.c_void_p,
+    'privatekey_group_to_ETH_address': ctypes.c_void_p,
+    'bloom_check_add': ctypes.c_int,
+    'bsgs_2nd_check': ctypes.c_bool,  #True or False
+    'check_collision': ctypes.c_bool,  #True or False
+}
+# Functions that do not use the precomputed tables, callable without building them
+_NO_TABLES = {'init_secp256_lib', 'version', 'free_memory', 'hash_to_address', 'b58_encode', 'b58_decode',
+              'bech32_address_decode', 'get_sha256', 'bloom_check_add', 'bloom_batch_add', 'bloom_check_add_mcpu',
+              'test_bit_set_bit', 'Load_data_to_memory', 'check_collision'}
 #==============================================================================
 ###############################################################################
 
@@ -210,6 +202,10 @@ ice.init_secp256_lib()
 def version():
     ice.version()   
 #==============================================================================
+def prepare():
+    ''' Load the library and build its precomputed tables now rather than on first use '''
+    ice.load()
+#==============================================================================
 def _scalar_multiplication(pvk_int):
     ''' Integer value passed to function. 65 bytes uncompressed pubkey output '''
     res = (b'\x00') * 65
@@ -233,6 +229,14 @@ def scalar_multiplications(pvk_int_list):
     res = _scalar_multiplications(pvk_int_list)
     return bytes(bytearray(res))
 #==============================================================================
+def scalar_multiplications_packed(pvk_bytes):
+    ''' Packed buffer of 32 bytes big-endian scalars passed to function. 65*len bytes uncompressed pubkey output. No Zero Point handling '''
+    sz = len(pvk_bytes) // 32
+    if sz == 0: return b''  # the library corrupts its heap on an empty batch
+    res = (b'\x00') * (65 * sz)
+    ice.scalar_multiplications(pvk_bytes, sz, res)
+    return res
+#==============================================================================
 # =============================================================================
 # def point_multiplication(k, P):
 #     ''' k=scalar. P = Input Point. Output is 65 bytes uncompressed pubkey '''
@@ -650,6 +654,161 @@ def privatekey_group_to_ETH_address_bytes(pvk_int, m):
     res = _privatekey_group_to_ETH_address_bytes(start_pvk, m)
     return bytes(bytearray(res))
 #==============================================================================
+# Buffer API. The _into functions write their result into a caller supplied
+# output buffer instead of allocating one, and take private keys as 32 bytes
+# big-endian scalars. Any writable buffer works: bytearray, memoryview, mmap,
+# numpy or ctypes arrays, the last passed on without even a view. A
+# memoryview slice writes into the middle of a larger buffer, so a batch can
+# be filled in place. Every function returns out.
+#==============================================================================
+def _check_size(buf, size):
+    if len(buf) < size: raise ValueError(f'Buffer size too small ({len(buf)} instead of at least {size} bytes)')
+    return buf
+
+def _in_buffer(buf, size):
+    ''' Input of size bytes passed without copying, unless it is a read only non bytes buffer '''
+    if type(buf) == bytes or isinstance(buf, ctypes.Array): return _check_size(buf, size)
+    try:
+        return (ctypes.c_char * size).from_buffer(buf)
+    except TypeError:
+        return (ctypes.c_char * size).from_buffer_copy(buf)
+
+def _out_buffer(buf, size):
+    ''' Writable ctypes view of the first size bytes of buf. A ctypes array, the cheapest to reuse, is passed as it is '''
+    if isinstance(buf, ctypes.Array): return _check_size(buf, size)
+    return (ctypes.c_char * size).from_buffer(buf)
+
+def _scalar_hex(pvk_scalar):
+    ''' 32 bytes scalar as the hex string the library parses '''
+    pass_int_value = binascii.hexlify(pvk_scalar)
+    if len(pass_int_value) != 64: raise ValueError('Private key scalar must be 32 bytes')
+    return pass_int_value
+#==============================================================================
+def scalar_multiplication_into(pvk_scalar, out):
+    ''' 32 bytes scalar passed to function. 65 bytes uncompressed pubkey written to out. No Zero Point handling '''
+    ice.scalar_multiplications(_in_buffer(pvk_scalar, 32), 1, _out_buffer(out, 65))
+    return out
+#==============================================================================
+def scalar_multiplications_into(pvk_scalars, out):
+    ''' Packed buffer of 32 bytes scalars passed to function. 65*len bytes uncompressed pubkeys written to out '''
+    sz = memoryview(pvk_scalars).nbytes // 32
+    if sz == 0: return out  # the library corrupts its heap on an empty batch
+    ice.scalar_multiplications(_in_buffer(pvk_scalars, 32 * sz), sz, _out_buffer(out, 65 * sz))
+    return out
+#==============================================================================
+def privatekey_to_h160_into(addr_type, iscompressed, pvk_scalar, out):
+    # type = 0 [p2pkh],  1 [p2sh],  2 [bech32]
+    ice.privatekey_to_h160(addr_type, iscompressed, _scalar_hex(pvk_scalar), _out_buffer(out, 20))
+    return out
+#==============================================================================
+def privatekey_loop_h160_into(num, addr_type, iscompressed, pvk_scalar, out):
+    # type = 0 [p2pkh],  1 [p2sh],  2 [bech32]
+    if num <= 0: num = 1
+    ice.privatekey_loop_h160(num, addr_type, iscompressed, _scalar_hex(pvk_scalar), _out_buffer(out, 20 * num))
+    return out
+#==============================================================================
+def privatekey_loop_h160_sse_into(num, addr_type, iscompressed, pvk_scalar, out):
+    # type = 0 [p2pkh],  1 [p2sh],  2 [bech32]
+    if num <= 0: num = 1
+    ice.privatekey_loop_h160_sse(num, addr_type, iscompressed, _scalar_hex(pvk_scalar), _out_buffer(out, 20 * num))
+    return out
+#==============================================================================
+def pubkey_to_h160_into(addr_type, iscompressed, pubkey_bytes, out):
+    ''' 65 Upub bytes input. 20 bytes hash160 written to out '''
+    ice.pubkey_to_h160(addr_type, iscompressed, _in_buffer(pubkey_bytes, 65), _out_buffer(out, 20))
+    return out
+#==============================================================================
+def point_addition_into(pubkey1_bytes, pubkey2_bytes, out):
+    ice.point_addition(_in_buffer(pubkey1_bytes, 65), _in_buffer(pubkey2_bytes, 65), _out_buffer(out, 65))
+    return out
+#==============================================================================
+def point_subtraction_into(pubkey1_bytes, pubkey2_bytes, out):
+    ice.point_subtraction(_in_buffer(pubkey1_bytes, 65), _in_buffer(pubkey2_bytes, 65), _out_buffer(out, 65))
+    return out
+#==============================================================================
+def point_loop_addition_into(num, pubkey1_bytes, pubkey2_bytes, out):
+    ''' P1+P2, P1+2P2, P1+3P2.... num pubkeys written to out '''
+    if num <= 0: num = 1
+    ice.point_loop_addition(num, _in_buffer(pubkey1_bytes, 65), _in_buffer(pubkey2_bytes, 65), _out_buffer(out, 65 * num))
+    return out
+#==============================================================================
+def point_loop_subtraction_into(num, pubkey1_bytes, pubkey2_bytes, out):
+    ''' P1-P2, P1-2P2, P1-3P2.... num pubkeys written to out '''
+    if num <= 0: num = 1
+    ice.point_loop_subtraction(num, _in_buffer(pubkey1_bytes, 65), _in_buffer(pubkey2_bytes, 65), _out_buffer(out, 65 * num))
+    return out
+#==============================================================================
+def point_sequential_increment_P2_into(num, pubkey1_bytes, out):
+    if num <= 0: num = 1
+    ice.point_sequential_increment_P2(num, _in_buffer(pubkey1_bytes, 65), _out_buffer(out, 65 * num))
+    return out
+#==============================================================================
+def point_sequential_increment_P2_mcpu_into(num, pubkey1_bytes, out, mcpu=os.cpu_count()):
+    if num <= 0: num = 1
+    ice.point_sequential_increment_P2_mcpu(num, _in_buffer(pubkey1_bytes, 65), mcpu, _out_buffer(out, 65 * num))
+    return out
+#==============================================================================
+def point_sequential_increment_into(num, pubkey1_bytes, out):
+    ''' P1+G, P1+2G, P1+3G.... num pubkeys written to out '''
+    if num <= 0: num = 1
+    ice.point_sequential_increment(num, _in_buffer(pubkey1_bytes, 65), _out_buffer(out, 65 * num))
+    return out
+#==============================================================================
+def point_sequential_decrement_into(num, pubkey1_bytes, out):
+    ''' P1-G, P1-2G, P1-3G.... num pubkeys written to out '''
+    if num <= 0: num = 1
+    ice.point_sequential_decrement(num, _in_buffer(pubkey1_bytes, 65), _out_buffer(out, 65 * num))
+    return out
+#==============================================================================
+def _address(buf):
+    ''' Memory address of a bytes object or of a ctypes view from _in_buffer/_out_buffer '''
+    if type(buf) == bytes: return ctypes.cast(ctypes.c_char_p(buf), ctypes.c_void_p).value
+    return ctypes.addressof(buf)
+
+def _pubkeys_to_h160_range(addr_type, iscompressed, pubs_addr, res_addr, first, last):
+    P = ctypes.c_char_p
+    pubkey_to_h160 = ice.pubkey_to_h160
+    for i in range(first, last):
+        pubkey_to_h160(addr_type, iscompressed, P(pubs_addr + 65 * i), P(res_addr + 20 * i))
+
+def _privatekeys_to_h160_range(addr_type, iscompressed, pvks_addr, res_addr, first, last):
+    pubs = (ctypes.c_char * (65 * (last - first)))()
+    ice.scalar_multiplications(ctypes.c_char_p(pvks_addr + 32 * first), last - first, pubs)
+    _pubkeys_to_h160_range(addr_type, iscompressed, ctypes.addressof(pubs) - 65 * first, res_addr, first, last)
+
+def _split(work, args, num, mcpu):
+    ''' Run work(*args, first, last) over 0..num, in mcpu threads. The library releases the GIL '''
+    mcpu = max(1, min(mcpu, num))
+    if mcpu == 1: return work(*args, 0, num)
+    bounds = [num * i // mcpu for i in range(mcpu + 1)]
+    threads = [threading.Thread(target=work, args=args + (bounds[i], bounds[i + 1])) for i in range(mcpu)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+def pubkeys_to_h160(addr_type, iscompressed, pubkeys, out=None, mcpu=1):
+    ''' Packed buffer of 65 bytes Upubs passed to function. Output is the packed 20*len bytes hash160s, written to out if given '''
+    # type = 0 [p2pkh],  1 [p2sh],  2 [bech32]
+    num = memoryview(pubkeys).nbytes // 65
+    res = (b'\x00') * (20 * num) if out is None else out
+    if num == 0: return res
+    pubs = _in_buffer(pubkeys, 65 * num)
+    h160s = res if out is None else _out_buffer(out, 20 * num)
+    _split(_pubkeys_to_h160_range, (addr_type, iscompressed, _address(pubs), _address(h160s)), num, mcpu)
+    return res
+
+def privatekeys_to_h160(addr_type, iscompressed, pvk_scalars, out=None, mcpu=1):
+    ''' Packed buffer or numpy array of 32 bytes big-endian scalars passed to function.
+    Output is the packed 20*len bytes hash160s, written to out if given. No Zero Point handling.
+    With mcpu > 1 the keys are split into that many threads '''
+    # type = 0 [p2pkh],  1 [p2sh],  2 [bech32]
+    num = memoryview(pvk_scalars).nbytes // 32
+    res = (b'\x00') * (20 * num) if out is None else out
+    if num == 0: return res  # the library corrupts its heap on an empty batch
+    pvks = _in_buffer(pvk_scalars, 32 * num)
+    h160s = res if out is None else _out_buffer(out, 20 * num)
+    _split(_privatekeys_to_h160_range, (addr_type, iscompressed, _address(pvks), _address(h160s)), num, mcpu)
+    return res
+#==============================================================================
 def bloom_check_add_mcpu(bigbuff, num_items, sz, mcpu, check_add, bloom_bits, bloom_hashes, bloom_filter):
     found_array = (b'\x00') * num_items
 #    sz = 32; check_add = 0 for check and 1 for add
@@ -693,14 +852,53 @@ def Fill_in_bloom(inp_list, _fp = 0.000001):
     del res
     return _bits, _hashes, _bf, _fp, len(inp_list)
 #==============================================================================
+def Fill_in_bloom_file(bin_file, _fp = 0.000001, sz = 20, chunk_records = 1000000, mcpu = 1):
+    ''' Bloom filter of the sz bytes records of a binary file such as the prepare_bin_file output.
+    The file is read chunk_records at a time and each chunk added with one bloom_check_add_mcpu call'''
+    _elem = os.path.getsize(bin_file) // sz
+    if _elem == 0: raise ValueError(f'No records in {bin_file} to build a Bloom filter from')
+    _bits, _hashes = bloom_para(_elem, _fp)
+    _bf = (b'\x00') * (_bits//8)
+    with open(bin_file, 'rb') as f:
+        while True:
+            chunk = f.read(sz * chunk_records)
+            if len(chunk) < sz: break
+            bloom_check_add_mcpu(chunk, len(chunk) // sz, sz, mcpu, 1, _bits, _hashes, _bf)  # 1 = Add
+    return _bits, _hashes, _bf, _fp, _elem
+#==============================================================================
+# Bloom file: a fixed little-endian header of magic, version, offset of the bit
+# array, _bits, _hashes, _fp and _elem, then the raw bit array at a page
+# aligned offset so it can be memory-mapped as it is
+BLOOM_MAGIC = b'ICEBLOOM'
+BLOOM_VERSION = 1
+BLOOM_HEADER = struct.Struct('<8sIIQIdQ')
+BLOOM_ALIGN = 4096
+
 def dump_bloom_file(output_bloom_file_name, _bits, _hashes, _bf, _fp, _elem):
+    header = BLOOM_HEADER.pack(BLOOM_MAGIC, BLOOM_VERSION, BLOOM_ALIGN, _bits, _hashes, _fp, _elem)
     with open(output_bloom_file_name, 'wb') as f:
-        pickle.dump((_bits, _hashes, _bf, _fp, _elem), f)
+        f.write(header.ljust(BLOOM_ALIGN, b'\x00'))
+        f.write(_bf)
 
 def read_bloom_file(bloom_file_name):
-    '''It will return the 5 output as _bits, _hashes, _bf, _fp, _elem'''
+    '''It will return the 5 output as _bits, _hashes, _bf, _fp, _elem.
+    _bf is mapped from the file, not read: every process opening the file shares one page cache copy.
+    Adding to it only changes the private copy of this process. Old pickled files are still read'''
     with open(bloom_file_name, 'rb') as f:
-        return pickle.load(f)
+        header = f.read(BLOOM_HEADER.size)
+        if header[:len(BLOOM_MAGIC)] != BLOOM_MAGIC:
+            f.seek(0)
+            return pickle.load(f)
+        magic, version, offset, _bits, _hashes, _fp, _elem = BLOOM_HEADER.unpack(header)
+        if version != BLOOM_VERSION:
+            raise ValueError(f'Unsupported bloom file version {version} in {bloom_file_name}')
+        size = _bits // 8
+        if os.fstat(f.fileno()).st_size < offset + size:
+            raise ValueError(f'Bloom file {bloom_file_name} is truncated')
+        # Copy on write keeps the pages shared, and writable for ctypes
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    _bf = (ctypes.c_char * size).from_buffer(mapped, offset)
+    return _bits, _hashes, _bf, _fp, _elem
 #==============================================================================
 def check_in_bloom(this_line, _bits, _hashes, _bf):
     if type(this_line) != bytes: tt = str(this_line).encode("utf-8")
@@ -730,7 +928,92 @@ def bsgs_2nd_check(pubkey_bytes, z1_int, bP_elem):
     found = ice.bsgs_2nd_check(pubkey_bytes, hex_value, bP_elem, res)
     return found, res
 #==============================================================================
-def prepare_bin_file_work(in_file, out_file, lower = False):
+# Runs merged at once by prepare_bin_file_stream, more are merged in several passes
+MAX_MERGE_RUNS = 256
+
+def _write_records(records, out_file, dedupe, block_records = 65536):
+    ''' Write sorted records to out_file in large blocks, dropping repeats if dedupe '''
+    with open(out_file, 'wb') as f:
+        block = []
+        prev = None
+        for record in records:
+            if dedupe:
+                if record == prev: continue
+                prev = record
+            block.append(record)
+            if len(block) >= block_records:
+                f.write(b''.join(block))
+                block = []
+        f.write(b''.join(block))
+
+def _read_records(f, record_size, block_records = 65536):
+    ''' Records of a run file, read in large blocks '''
+    while True:
+        block = f.read(record_size * block_records)
+        if not block: return
+        for i in range(0, len(block), record_size):
+            yield block[i:i+record_size]
+
+def _new_run(runs, tmp_dir):
+    fd, run = tempfile.mkstemp(suffix = '.run', dir = tmp_dir)
+    os.close(fd)
+    runs.append(run)
+    return run
+
+def _merge_runs(runs, out_file, record_size, dedupe):
+    files = [open(run, 'rb') for run in runs]
+    try:
+        _write_records(heapq.merge(*[_read_records(f, record_size) for f in files]), out_file, dedupe)
+    finally:
+        for f in files: f.close()
+
+def prepare_bin_file_stream(in_file, out_file, chunk_records = 2000000, dedupe = False, record_size = 20, tmp_dir = None):
+    ''' Same output as prepare_bin_file_work, in memory bounded by chunk_records records.
+    Lines are parsed into record_size byte records one chunk at a time. Every chunk is sorted
+    and spilled to a temporary run file in tmp_dir (default: next to out_file), then the runs
+    are merged into out_file. dedupe drops repeated records '''
+    tmp_dir = tmp_dir or os.path.dirname(os.path.abspath(out_file))
+    runs = []
+    try:
+        chunk = []
+        with open(in_file, 'r') as f:
+            for line in f:
+                token = line.split()
+                if not token: continue
+                token = token[0]
+                if token[:2].lower() == '0x': token = token[2:]
+                record = bytes.fromhex(token)
+                if len(record) != record_size:
+                    raise ValueError(f'Record of {len(record)} bytes instead of {record_size} in {in_file}: {token}')
+                chunk.append(record)
+                if len(chunk) >= chunk_records:
+                    chunk.sort()
+                    _write_records(chunk, _new_run(runs, tmp_dir), dedupe)
+                    chunk = []
+        chunk.sort()
+        if not runs:
+            # Everything fit in one chunk
+            _write_records(chunk, out_file, dedupe)
+            return
+        _write_records(chunk, _new_run(runs, tmp_dir), dedupe)
+        del chunk
+
+        while len(runs) > MAX_MERGE_RUNS:
+            group = runs[:MAX_MERGE_RUNS]
+            merged = _new_run(runs, tmp_dir)
+            _merge_runs(group, merged, record_size, dedupe)
+            for run in group:
+                os.remove(run)
+            del runs[:MAX_MERGE_RUNS]
+        _merge_runs(runs, out_file, record_size, dedupe)
+    finally:
+        for run in runs:
+            if os.path.isfile(run): os.remove(run)
+#==============================================================================
+def prepare_bin_file_work(in_file, out_file, lower = False, chunk_records = 0, dedupe = False):
+    ''' chunk_records > 0 sorts in bounded memory with prepare_bin_file_stream '''
+    if chunk_records > 0:
+        return prepare_bin_file_stream(in_file, out_file, chunk_records, dedupe)
     use0x = False
     inp_list = [line.split()[0].lower() if lower else line.split()[0] for line in open(in_file,'r')]
     if inp_list[0][:2] == '0x': use0x = True
@@ -742,10 +1025,10 @@ def prepare_bin_file_work(in_file, out_file, lower = False):
         for line in inp_list:
             f.write(bytes.fromhex(line))
 #==============================================================================
-def prepare_bin_file(in_file, out_file, overwrite = False, lower = False):
+def prepare_bin_file(in_file, out_file, overwrite = False, lower = False, chunk_records = 0, dedupe = False):
     
     if os.path.isfile(out_file) == False:
-        prepare_bin_file_work(in_file, out_file, lower)
+        prepare_bin_file_work(in_file, out_file, lower, chunk_records, dedupe)
 
     else:
         if not overwrite:
@@ -753,7 +1036,7 @@ def prepare_bin_file(in_file, out_file, overwrite = False, lower = False):
             
         else:
             print(f'[+] File {out_file} already exist. Overwriting it...')
-            prepare_bin_file_work(in_file, out_file)
+            prepare_bin_file_work(in_file, out_file, lower, chunk_records, dedupe)
 #==============================================================================
 def Load_data_to_memory(input_bin_file, verbose = False):
     '''input_bin_file is sorted h160 data of 20 bytes each element. 
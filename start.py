@@ -1,50 +1,52 @@
 import tkinter as tk
 from tkinter import ttk
-from decimal import Decimal, getcontext
-import secp256k1 as ice
-import math
+from fractions import Fraction
+from scanner import ScanWorker, PUZZLE_TARGET, PUZZLE_RANGE_START, PUZZLE_RANGE_END
+from keycache import make_seen_cache
+from viewport import Viewport, AutoScroller, FRAC_BITS, ONE
+from targets import TargetSet
+from plans import Plan, DEFAULT_PLAN_TEXT
+from render import color_for_value, render_row, photo_row, TileCache
+from frames import FrameScheduler
+from metrics import METRICS
+from coverindex import CoverageIndex
 import random
+import time
 
-# Set high precision for decimal calculations
-getcontext().prec = 100
-target = '12VVRNPi4SJqUTsp6FmqDqY5sGosDtysn4'
+target = PUZZLE_TARGET
+# Optional file of addresses or hash160 hex, one per line, searched instead of target
+target_file = None
+# False positive rate of the Bloom prefilter used with target_file, None for exact lookups only
+target_bloom_fp = 0.000001
+# Transformation plan every value is expanded with, see plans.py
+transform_plan = DEFAULT_PLAN_TEXT
+# Processes used to scan each value. 1 scans on the background worker thread only
+scan_processes = 1
+# Recently checked keys are skipped: 'lru' (exact), 'bloom' (approximate) or None
+seen_cache_mode = 'lru'
+seen_cache_bytes = 64 * 1024 * 1024
+# Coverage index path shared with headless.py --coverage, None to rescan freely
+coverage_path = None
+coverage_bitmap_bytes = 16 * 1024 * 1024
+# Memory for rendered colour tiles reused while zooming and panning, None renders every frame from scratch
+tile_cache_bytes = 32 * 1024 * 1024
+# Target display frame time in ms, also the auto-scroll tick. Frames stretch when
+# drawing takes more than half of it, leaving the rest to the scanner
+frame_ms = 10
+# JSON file the throughput and latency metrics are written to every metrics_interval seconds, None for none
+metrics_file = None
+metrics_interval = 10
 
 def shuffle_string(s):
     char_list = list(s)
     random.shuffle(char_list)
     return ''.join(char_list)
-    
-def rotate_hex(hex_string):
-    # Precompute a translation table for all hex digits
-    translation_table = str.maketrans("0123456789abcdef", "123456789abcdef0")
-    return hex_string.translate(translation_table)
-
-def shift_left(s, n):
-    n = n % len(s)
-    return s[n:] + s[:n]
-
-def inverse(binary_string):
-    # Ensure the input is valid
-    if not all(char in '01' for char in binary_string):
-        raise ValueError("Input string must contain only '0' and '1'")
-    
-    return ''.join('1' if char == '0' else '0' for char in binary_string)
 
 class HexRangeExplorer:
     def __init__(self, root):
         self.root = root
         self.root.title("Hex Range Explorer")
         
-        # Define the range using Decimal for precise calculations
-        self.range_start = 0x1000000000000000000
-        self.range_end = 0x1ffffffffffffffffff
-        self.range_size = self.range_end - self.range_start + 1
-        
-        # Use Decimal for precise position tracking
-        self.range_start_dec = Decimal(self.range_start)
-        self.range_end_dec = Decimal(self.range_end)
-        self.range_size_dec = Decimal(self.range_size)
-        
         # Create main frame
         main_frame = ttk.Frame(root, padding="10")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -56,6 +58,9 @@ class HexRangeExplorer:
                                height=self.canvas_height, bg='black')
         self.canvas.grid(row=0, column=0, columnspan=2)
         
+        # Precise viewport tracking, shared with the headless scanner
+        self.viewport = Viewport(PUZZLE_RANGE_START, PUZZLE_RANGE_END, self.canvas_width)
+        
         # Create info labels with monospace font for better hex display
         font_mono = ('Courier', 10)
         
@@ -71,20 +76,20 @@ class HexRangeExplorer:
         self.zoom_info_label = ttk.Label(main_frame, text="Zoom: 1x", font=font_mono)
         self.zoom_info_label.grid(row=4, column=0, sticky=tk.W, pady=5)
         
+        self.status_label = ttk.Label(main_frame, text="Scanner: running", font=font_mono)
+        self.status_label.grid(row=6, column=0, sticky=tk.W, pady=5)
+        
+        self.metrics_label = ttk.Label(main_frame, text="", font=font_mono)
+        self.metrics_label.grid(row=7, column=0, sticky=tk.W, pady=5)
+        self.metrics_polls = 0
+        
         # Auto-scroll controls
         control_frame = ttk.Frame(main_frame)
         control_frame.grid(row=5, column=0, columnspan=2, pady=10, sticky=(tk.W, tk.E))
         
         self.auto_scroll_enabled = False
-        self.auto_scroll_speed = 1.0  # pixels per frame
-        self.auto_scroll_direction = 1  # 1 for right, -1 for left
-        self.random_mode = False  # Random walk mode
-        self.random_change_interval = 30  # Frames before changing direction
-        self.random_frame_count = 0
-        self.random_target_x = self.canvas_width // 2
-        self.random_velocity_x = 0
-        self.random_zoom_target = 1.0  # Target zoom level
-        self.random_zoom_velocity = 0  # Zoom velocity
+        # Linear and random-walk motion state (speed, direction, mode, cursor x)
+        self.scroller = AutoScroller(self.viewport)
         
         self.auto_button = ttk.Button(control_frame, text="Start Auto-Scroll", 
                                      command=self.toggle_auto_scroll)
@@ -109,10 +114,6 @@ class HexRangeExplorer:
                                           command=self.toggle_direction)
         self.direction_button.grid(row=0, column=5, padx=5)
         
-        # Precise viewport tracking using Decimal
-        self.viewport_start = Decimal(self.range_start)
-        self.viewport_end = Decimal(self.range_end)
-        
         # Bind mouse events - fix platform-specific bindings
         self.canvas.bind("<Motion>", self.on_mouse_move)
         self.canvas.bind("<Button-1>", self.on_click)
@@ -128,8 +129,8 @@ class HexRangeExplorer:
         
         # Keyboard bindings for auto-scroll control
         root.bind("<space>", lambda e: self.toggle_auto_scroll())
-        root.bind("<Left>", lambda e: self.set_direction(-1) if not self.random_mode else None)
-        root.bind("<Right>", lambda e: self.set_direction(1) if not self.random_mode else None)
+        root.bind("<Left>", lambda e: self.set_direction(-1) if not self.scroller.random_mode else None)
+        root.bind("<Right>", lambda e: self.set_direction(1) if not self.scroller.random_mode else None)
         root.bind("<Up>", lambda e: self.increase_speed())
         root.bind("<Down>", lambda e: self.decrease_speed())
         root.bind("<r>", lambda e: self.toggle_random_mode())
@@ -141,10 +142,29 @@ class HexRangeExplorer:
         self.drag_start_x = None
         self.drag_start_viewport = None
         
-        # Store last mouse position
-        self.last_mouse_x = self.canvas_width // 2
+        # Key checking runs on a background worker so the UI never blocks
+        # Targets are decoded once so candidates can be compared as raw hash160 bytes
+        if target_file:
+            targets = TargetSet.from_file(target_file, bloom_fp=target_bloom_fp)
+        else:
+            targets = TargetSet.from_address(target)
+        plan = Plan(transform_plan)
+        coverage = None
+        if coverage_path:
+            coverage = CoverageIndex(coverage_path, coverage_bitmap_bytes, tag=plan.text)
+        self.scanner = ScanWorker(targets, processes=scan_processes, plan=plan,
+                                  cache=make_seen_cache(seen_cache_mode, seen_cache_bytes),
+                                  coverage=coverage)
+        self.root.after(50, self.poll_scanner)
+        # Let the worker write the coverage index before the window goes away
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Labels, crosshair and redraws are applied once per display frame
+        self.frames = FrameScheduler(self.root.after, frame_ms, metrics=METRICS)
         
         # Draw initial display
+        self.num_markers = 10
+        self.create_display_items()
         self.draw_display()
         
     def toggle_auto_scroll(self):
@@ -158,26 +178,25 @@ class HexRangeExplorer:
     
     def toggle_direction(self):
         """Toggle scroll direction"""
-        self.auto_scroll_direction *= -1
-        if self.auto_scroll_direction > 0:
+        self.scroller.direction *= -1
+        if self.scroller.direction > 0:
             self.direction_button.config(text="Direction: →")
         else:
             self.direction_button.config(text="Direction: ←")
     
     def update_speed(self, value):
         """Update scroll speed from slider"""
-        self.auto_scroll_speed = float(value)
-        self.speed_label.config(text=f"{self.auto_scroll_speed:.1f}x")
+        self.scroller.speed = float(value)
+        self.speed_label.config(text=f"{self.scroller.speed:.1f}x")
     
     def toggle_random_mode(self):
         """Toggle random walk mode"""
-        self.random_mode = not self.random_mode
-        if self.random_mode:
+        self.scroller.random_mode = not self.scroller.random_mode
+        if self.scroller.random_mode:
             self.random_button.config(text="Random Mode: ON")
             self.direction_button.config(state='disabled')
             # Initialize random movement
-            self.random_target_x = random.randint(0, self.canvas_width)
-            self.random_velocity_x = 0
+            self.scroller.start_random_walk()
         else:
             self.random_button.config(text="Random Mode: OFF")
             self.direction_button.config(state='normal')
@@ -187,337 +206,131 @@ class HexRangeExplorer:
         if not self.auto_scroll_enabled:
             return
         
-        if self.random_mode:
-            # Random walk mode
-            self.random_frame_count += 1
-            
-            # Change target occasionally or when reached
-            if self.random_frame_count >= self.random_change_interval or abs(self.random_target_x - self.last_mouse_x) < 5:
-                self.random_frame_count = 0
-                self.random_change_interval = random.randint(20, 60)  # Vary the interval
-                
-                # Choose new random target position
-                self.random_target_x = random.randint(0, self.canvas_width)
-                
-                # Also change zoom target occasionally
-                if random.random() < 0.3:  # 30% chance to change zoom
-                    current_zoom = float(self.range_size_dec / (self.viewport_end - self.viewport_start))
-                    # Random zoom between 0.5x and 100000x on logarithmic scale
-                    log_min = math.log10(0.5)
-                    log_max = math.log10(100000)
-                    log_target = random.uniform(log_min, log_max)
-                    self.random_zoom_target = 10 ** log_target
-                
-                # Occasionally do a random jump in the viewport
-                if random.random() < 0.1:  # 10% chance
-                    # Random jump to a different part of the range
-                    jump_factor = random.uniform(-0.5, 0.5)
-                    viewport_size = self.viewport_end - self.viewport_start
-                    jump_amount = viewport_size * Decimal(jump_factor)
-                    
-                    new_start = self.viewport_start + jump_amount
-                    new_end = self.viewport_end + jump_amount
-                    
-                    # Clamp to valid range
-                    if new_start < self.range_start_dec:
-                        new_end = new_end + (self.range_start_dec - new_start)
-                        new_start = self.range_start_dec
-                    elif new_end > self.range_end_dec:
-                        new_start = new_start - (new_end - self.range_end_dec)
-                        new_end = self.range_end_dec
-                    
-                    self.viewport_start = new_start
-                    self.viewport_end = new_end
-            
-            # Handle random zooming
-            current_zoom = float(self.range_size_dec / (self.viewport_end - self.viewport_start))
-            zoom_diff = math.log10(self.random_zoom_target / current_zoom)
-            self.random_zoom_velocity += zoom_diff * 0.05  # Acceleration
-            self.random_zoom_velocity *= 0.9  # Damping
-            
-            # Apply zoom change
-            if abs(self.random_zoom_velocity) > 0.001:
-                zoom_factor = 1.0 - (self.random_zoom_velocity * 0.02 * self.auto_scroll_speed)
-                zoom_factor = max(0.95, min(1.05, zoom_factor))  # Limit zoom speed
-                
-                # Get value at current position before zoom
-                current_x = int(self.last_mouse_x)
-                value_under_cursor = Decimal(self.get_value_at_position(current_x))
-                
-                # Apply zoom
-                mouse_fraction = Decimal(current_x) / Decimal(self.canvas_width)
-                old_size = self.viewport_end - self.viewport_start
-                new_size = old_size * Decimal(zoom_factor)
-                
-                # Limit size
-                if new_size < 1:
-                    new_size = Decimal('1')
-                if new_size > self.range_size_dec:
-                    new_size = self.range_size_dec
-                
-                # Calculate new viewport
-                new_start = value_under_cursor - mouse_fraction * new_size
-                new_end = new_start + new_size
-                
-                # Adjust if outside bounds
-                if new_start < self.range_start_dec:
-                    new_end = new_end + (self.range_start_dec - new_start)
-                    new_start = self.range_start_dec
-                elif new_end > self.range_end_dec:
-                    new_start = new_start - (new_end - self.range_end_dec)
-                    new_end = self.range_end_dec
-                
-                self.viewport_start = new_start
-                self.viewport_end = new_end
-                
-                # Redraw when zoom changes
-                self.draw_display()
-                self.update_zoom_info()
-            
-            # Smooth movement towards target
-            diff = self.random_target_x - self.last_mouse_x
-            self.random_velocity_x += diff * 0.1  # Acceleration
-            self.random_velocity_x *= 0.9  # Damping
-            
-            # Apply velocity with speed scaling
-            move_x = self.random_velocity_x * self.auto_scroll_speed * 0.1
-            new_x = self.last_mouse_x + move_x
-            
-            # Keep within bounds
-            new_x = max(0, min(self.canvas_width, new_x))
-            
-            # Create synthetic mouse event for the new position
-            event = type('obj', (object,), {'x': int(new_x), 'y': self.canvas_height // 2})
-            
-            # Process the value at this position
-            value = self.get_value_at_position(int(new_x))
-            self.process_hex_value(value)
-            
-            # Update position for next frame
-            self.last_mouse_x = int(new_x)
+        direction = self.scroller.direction
+        x, value, zoomed = self.scroller.step()
+        self.process_hex_value(value)
+        
+        if self.scroller.random_mode:
+            # Redraw when zoom changes
+            if zoomed:
+                self.request_redraw()
             
             # Update display
-            self.position_label.config(text=f"Position: ({int(new_x)}, {self.canvas_height // 2})")
-            self.hex_label.config(text=f"Hex: 0x{value:x}")
-            self.decimal_label.config(text=f"Decimal: {value:,}")
+            self.show_position(x, self.canvas_height // 2, value)
             
             # Draw crosshair at current position
-            self.canvas.delete("crosshair")
-            self.canvas.create_line(int(new_x), 0, int(new_x), self.canvas_height - 40,
-                                  fill='red', width=2, tags="crosshair")
-            self.canvas.create_rectangle(int(new_x) - 3, self.canvas_height - 40,
-                                       int(new_x) + 3, self.canvas_height,
-                                       fill='red', tags="crosshair")
+            self.show_crosshair(x, None, 'red', 2, 3)
             
         else:
-            # Original linear scrolling mode
-            viewport_size = self.viewport_end - self.viewport_start
-            scroll_amount = (viewport_size / Decimal(self.canvas_width)) * Decimal(self.auto_scroll_speed) * Decimal(self.auto_scroll_direction)
-            
-            new_start = self.viewport_start + scroll_amount
-            new_end = self.viewport_end + scroll_amount
-            
-            if new_start < self.range_start_dec:
-                new_start = self.range_start_dec
-                new_end = new_start + viewport_size
-                self.auto_scroll_direction = 1
-                self.direction_button.config(text="Direction: →")
-            elif new_end > self.range_end_dec:
-                new_end = self.range_end_dec
-                new_start = new_end - viewport_size
-                self.auto_scroll_direction = -1
-                self.direction_button.config(text="Direction: ←")
-            
-            self.viewport_start = new_start
-            self.viewport_end = new_end
+            # Original linear scrolling mode, bouncing off the ends of the range.
+            # The button is only relabelled on a bounce
+            if self.scroller.direction != direction:
+                self.set_direction(self.scroller.direction)
             
-            self.draw_display()
-            self.update_zoom_info()
-            
-            center_x = self.canvas_width // 2
-            center_value = self.get_value_at_position(center_x)
-            self.process_hex_value(center_value)
-            
-            self.canvas.delete("crosshair")
-            self.canvas.create_line(center_x, 0, center_x, self.canvas_height - 40,
-                                  fill='yellow', width=2, tags="crosshair")
-            self.canvas.create_rectangle(center_x - 2, self.canvas_height - 40,
-                                       center_x + 2, self.canvas_height,
-                                       fill='yellow', tags="crosshair")
-        
-        # Schedule next frame
-        self.root.after(10, self.auto_scroll)
+            self.request_redraw()
+            self.show_crosshair(x, None, 'yellow', 2, 2)
+        
+        # Schedule next step, one frame interval away
+        self.root.after(self.frames.tick_ms(), self.auto_scroll)
     
     def get_color_for_value(self, value, zoom_level):
         """Get color based on value and zoom level"""
-        # Normalize value to 0-1 range
-        norm_value = float((Decimal(value) - self.range_start_dec) / self.range_size_dec)
+        return color_for_value(self.viewport, value, zoom_level)
+    
+    def create_display_items(self):
+        """Create the canvas items once; draw_display only updates them"""
+        self.tiles = TileCache(self.canvas_width, tile_cache_bytes) if tile_cache_bytes else None
         
-        # At high zoom levels, show bit patterns
-        if zoom_level > 1000000:
-            # Show individual bits as alternating patterns
-            bit_pattern = value & 0xFF  # Look at lower 8 bits
-            brightness = 50 + (bit_pattern * 205 // 255)
-            
-            # Create patterns based on bit positions
-            r = brightness if (value & 0x1) else brightness // 2
-            g = brightness if (value & 0x10) else brightness // 2
-            b = brightness if (value & 0x100) else brightness // 2
-            
-        # At medium zoom levels, show byte boundaries
-        elif zoom_level > 10000:
-            # Color based on byte values
-            byte_val = (value >> 8) & 0xFF
-            hue = (byte_val / 255.0) * 360
-            r, g, b = self.hsv_to_rgb(hue, 0.8, 0.9)
+        # The visualization is one row of colours tiled down a single image
+        self.raster = tk.PhotoImage(width=self.canvas_width, height=self.canvas_height)
+        self.canvas.create_image(0, 0, image=self.raster, anchor='nw')
+        
+        # Background for scale
+        self.canvas.create_rectangle(0, self.canvas_height - 40, self.canvas_width, self.canvas_height,
+                                   fill='gray20', outline='')
+        
+        self.scale_labels = []
+        for i in range(self.num_markers + 1):
+            x = int(i * self.canvas_width / self.num_markers)
             
-        # At low zoom levels, show smooth gradient
-        else:
-            # Smooth gradient with multiple color stops
-            if norm_value < 0.25:
-                # Blue to Cyan
-                r = 0
-                g = int(255 * (norm_value * 4))
-                b = 255
-            elif norm_value < 0.5:
-                # Cyan to Green
-                r = 0
-                g = 255
-                b = int(255 * (1 - (norm_value - 0.25) * 4))
-            elif norm_value < 0.75:
-                # Green to Yellow
-                r = int(255 * ((norm_value - 0.5) * 4))
-                g = 255
-                b = 0
-            else:
-                # Yellow to Red
-                r = 255
-                g = int(255 * (1 - (norm_value - 0.75) * 4))
-                b = 0
+            # Tick marks - longer for major marks
+            tick_height = 15 if i % 2 == 0 else 10
+            self.canvas.create_line(x, self.canvas_height - tick_height, x, self.canvas_height,
+                                  fill='white', width=2 if i % 2 == 0 else 1)
+            self.scale_labels.append(
+                self.canvas.create_text(x, self.canvas_height - tick_height - 5,
+                                      text='', fill='white',
+                                      anchor='s', font=('Courier', 8)))
         
-        return f'#{r:02x}{g:02x}{b:02x}'
+        # Center line
+        center_x = self.canvas_width // 2
+        self.canvas.create_line(center_x, 0, center_x, self.canvas_height,
+                              fill='white', width=2, dash=(5, 5))
+        
+        # Crosshair, moved by place_crosshair
+        self.crosshair_line = self.canvas.create_line(0, 0, 0, 0, state='hidden')
+        self.crosshair_hline = self.canvas.create_line(0, 0, 0, 0, dash=(3, 3), state='hidden')
+        self.crosshair_marker = self.canvas.create_rectangle(0, 0, 0, 0, state='hidden')
+    
+    def request_redraw(self):
+        self.frames.request('redraw', self.redraw)
+    
+    def redraw(self):
+        started = time.perf_counter()
+        self.draw_display()
+        self.update_zoom_info()
+        METRICS.observe('render', time.perf_counter() - started)
+    
+    def show_position(self, x, y, value):
+        """Update the position labels in the next frame"""
+        self.frames.request('labels', lambda: self.update_labels(x, y, value))
+    
+    def update_labels(self, x, y, value):
+        self.position_label.config(text=f"Position: ({x}, {y})")
+        self.hex_label.config(text=f"Hex: 0x{value:x}")
+        self.decimal_label.config(text=f"Decimal: {value:,}")
     
-    def hsv_to_rgb(self, h, s, v):
-        """Convert HSV to RGB"""
-        h = h / 360.0
-        i = int(h * 6)
-        f = h * 6 - i
-        p = v * (1 - s)
-        q = v * (1 - f * s)
-        t = v * (1 - (1 - f) * s)
-        
-        i = i % 6
-        if i == 0:
-            r, g, b = v, t, p
-        elif i == 1:
-            r, g, b = q, v, p
-        elif i == 2:
-            r, g, b = p, v, t
-        elif i == 3:
-            r, g, b = p, q, v
-        elif i == 4:
-            r, g, b = t, p, v
+    def show_crosshair(self, x, y, color, width, half):
+        """Move the crosshair in the next frame; y=None leaves out the horizontal line"""
+        self.frames.request('crosshair', lambda: self.place_crosshair(x, y, color, width, half))
+    
+    def place_crosshair(self, x, y, color, width, half):
+        self.canvas.coords(self.crosshair_line, x, 0, x, self.canvas_height - 40)
+        self.canvas.itemconfig(self.crosshair_line, fill=color, width=width, state='normal')
+        if y is None:
+            self.canvas.itemconfig(self.crosshair_hline, state='hidden')
         else:
-            r, g, b = v, p, q
-            
-        return int(r * 255), int(g * 255), int(b * 255)
+            self.canvas.coords(self.crosshair_hline, 0, y, self.canvas_width, y)
+            self.canvas.itemconfig(self.crosshair_hline, fill=color, state='normal')
+        
+        # Highlight current value on scale
+        self.canvas.coords(self.crosshair_marker, x - half, self.canvas_height - 40,
+                           x + half, self.canvas_height)
+        self.canvas.itemconfig(self.crosshair_marker, fill=color, state='normal')
     
     def draw_display(self):
         """Draw the visual representation with zoom-dependent detail"""
-        self.canvas.delete("all")
-        
-        viewport_range = self.viewport_end - self.viewport_start
-        zoom_level = float(self.range_size_dec / viewport_range)
-        values_per_pixel = viewport_range / Decimal(self.canvas_width)
-        
-        # Determine drawing resolution based on zoom
-        if values_per_pixel > 100000:
-            # Very zoomed out - draw in larger chunks
-            step = 4
-        elif values_per_pixel > 1000:
-            # Moderately zoomed out
-            step = 2
+        if self.tiles is not None:
+            row = self.tiles.render_row(self.viewport)
         else:
-            # Zoomed in - draw every pixel
-            step = 1
-        
-        # Draw the main visualization
-        for x in range(0, self.canvas_width, step):
-            # Calculate value at this position
-            position = Decimal(x) / Decimal(self.canvas_width)
-            value = self.viewport_start + position * viewport_range
-            value_int = int(value)
-            
-            # Get color based on value and zoom level
-            color = self.get_color_for_value(value_int, zoom_level)
-            
-            # Draw vertical line or rectangle
-            if step > 1:
-                self.canvas.create_rectangle(x, 0, x + step, self.canvas_height,
-                                           fill=color, outline='')
-            else:
-                self.canvas.create_line(x, 0, x, self.canvas_height,
-                                      fill=color, width=1)
-        
-        # Draw grid lines at high zoom levels
-        if zoom_level > 100000:
-            self.draw_grid_lines()
+            row = render_row(self.viewport, self.canvas_width)
+        self.raster.put(photo_row(row), to=(0, 0, self.canvas_width, self.canvas_height))
         
         # Draw scale markers
         self.draw_scale_markers()
-        
-        # Draw center line
-        center_x = self.canvas_width // 2
-        self.canvas.create_line(center_x, 0, center_x, self.canvas_height,
-                              fill='white', width=2, dash=(5, 5))
-    
-    def draw_grid_lines(self):
-        """Draw grid lines for better orientation at high zoom"""
-        viewport_range = self.viewport_end - self.viewport_start
-        
-        # Calculate appropriate grid spacing
-        grid_spacing = 1
-        while grid_spacing * 20 < float(viewport_range):
-            grid_spacing *= 16  # Hex-based spacing
-        
-        # Find first grid line
-        start_grid = int(self.viewport_start / grid_spacing) * grid_spacing
-        
-        # Draw vertical grid lines
-        for i in range(50):  # Limit iterations
-            grid_value = start_grid + i * grid_spacing
-            if grid_value > self.viewport_end:
-                break
-                
-            x = int((Decimal(grid_value) - self.viewport_start) / 
-                   (self.viewport_end - self.viewport_start) * self.canvas_width)
-            
-            if 0 <= x <= self.canvas_width:
-                self.canvas.create_line(x, 0, x, self.canvas_height,
-                                      fill='gray30', width=1)
     
     def draw_scale_markers(self):
-        """Draw enhanced scale markers with better visibility"""
-        num_markers = 10
-        viewport_range = self.viewport_end - self.viewport_start
-        zoom_level = float(self.range_size_dec / viewport_range)
+        """Update the scale labels for the current viewport"""
+        zoom_level = self.viewport.zoom_level()
         
-        # Draw background for scale
-        self.canvas.create_rectangle(0, self.canvas_height - 40, self.canvas_width, self.canvas_height,
-                                   fill='gray20', outline='')
-        
-        for i in range(num_markers + 1):
-            x = int(i * self.canvas_width / num_markers)
-            
-            # Tick marks - longer for major marks
-            tick_height = 15 if i % 2 == 0 else 10
-            self.canvas.create_line(x, self.canvas_height - tick_height, x, self.canvas_height,
-                                  fill='white', width=2 if i % 2 == 0 else 1)
+        for i, label in enumerate(self.scale_labels):
+            # Only show labels for major marks to avoid crowding
+            if not (i % 2 == 0 or zoom_level > 100):
+                self.canvas.itemconfig(label, state='hidden')
+                continue
             
             # Hex value at this position
-            position_dec = Decimal(i) / Decimal(num_markers)
-            value_dec = self.viewport_start + position_dec * viewport_range
-            value = int(value_dec)
+            value = (self.viewport.start_fp * self.num_markers + i * self.viewport.size_fp) // (self.num_markers << FRAC_BITS)
             
             # Format hex string based on zoom level
             hex_str = f"{value:x}"
@@ -532,61 +345,47 @@ class HexRangeExplorer:
             else:
                 display_str = hex_str
             
-            # Only show labels for major marks to avoid crowding
-            if i % 2 == 0 or zoom_level > 100:
-                self.canvas.create_text(x, self.canvas_height - tick_height - 5,
-                                      text=display_str, fill='white',
-                                      anchor='s', font=('Courier', 8))
+            self.canvas.itemconfig(label, text=display_str, state='normal')
     
     def get_value_at_position(self, x):
         """Calculate the exact hex value at a given canvas position using high precision"""
-        # Use Decimal for precise calculation
-        position_dec = Decimal(x) / Decimal(self.canvas_width)
-        viewport_size = self.viewport_end - self.viewport_start
-        
-        # Calculate exact value
-        value_dec = self.viewport_start + position_dec * viewport_size
-        
-        # Round to nearest integer
-        value = int(value_dec.quantize(Decimal('1')))
-        
-        # Ensure within bounds
-        value = max(self.range_start, min(self.range_end, value))
-        
-        return value
+        return self.viewport.value_at(x)
     
     def process_hex_value(self, value):
-        """Process a hex value through all transformations"""
-        size = 72
-        hexSize = size // 4
-        bin2 = bin(value)[2:].zfill(size)[:size]
-        for inv in range(2):
-            for z in range(2):
-                for y in range(size):
-                    pp = int(bin2, 2)
-                    hex2 = hex(pp)[2:].zfill(hexSize)
-                    for x in range(16):
-                        p = int('1' + hex2, 16)
-                        address = ice.privatekey_to_address(0, True, p)
-
-                        if y == 0 and z == 0 and inv == 0 and x == 0:
-                            print(bin2 + ' - ' + hex(p)[2:] + ' -> ' + address)
-                            
-                        if address == target: 
-                            print(hex(p)[2:] + ' -> ' + address)
-                            print('found')
-                            with open('found.txt', 'a') as file:
-                                file.write(hex(p)[2:] + ' -> ' + address + "\n")
-                            return True
-                        hex2 = rotate_hex(hex2)
-                    bin2 = shift_left(bin2, 1)
-                bin2 = bin2[::-1]
-            bin2 = inverse(bin2)
-        return False
+        """Hand a hex value to the scan worker, superseding any stale pending one"""
+        self.scanner.submit(value)
+    
+    def poll_scanner(self):
+        """Pick up keys reported by the scan worker"""
+        if not self.scanner.thread.is_alive() and self.scanner.error is not None:
+            self.status_label.config(text=f"Scanner: stopped by an error, {self.scanner.error!r}")
+        elif not self.scanner.stopped.is_set():
+            hits, misses = self.scanner.cache_stats()
+            status = f"Scanner: running | Seen-key cache: {hits:,} hits, {misses:,} misses"
+            if self.scanner.coverage is not None:
+                status += f" | Already covered: {self.scanner.skipped_covered:,}"
+            self.status_label.config(text=status)
+        # Rates are averaged over a second of polls
+        self.metrics_polls += 1
+        if self.metrics_polls >= 20:
+            self.metrics_polls = 0
+            self.metrics_label.config(text=METRICS.status_line())
+            METRICS.maybe_write(metrics_file, metrics_interval)
+        for pvk in self.scanner.poll():
+            self.status_label.config(text=f"Scanner: FOUND 0x{pvk:x} (saved to found.txt)")
+            # The worker stops on a hit, so stop feeding it
+            if self.auto_scroll_enabled:
+                self.toggle_auto_scroll()
+        self.root.after(50, self.poll_scanner)
     
+    def on_close(self):
+        self.scanner.stop()
+        self.scanner.thread.join(timeout=5)
+        self.root.destroy()
+
     def set_direction(self, direction):
         """Set scroll direction"""
-        self.auto_scroll_direction = direction
+        self.scroller.direction = direction
         if direction > 0:
             self.direction_button.config(text="Direction: →")
         else:
@@ -594,13 +393,13 @@ class HexRangeExplorer:
     
     def increase_speed(self):
         """Increase scroll speed"""
-        new_speed = min(10.0, self.auto_scroll_speed + 0.5)
+        new_speed = min(10.0, self.scroller.speed + 0.5)
         self.speed_var.set(new_speed)
         self.update_speed(new_speed)
     
     def decrease_speed(self):
         """Decrease scroll speed"""
-        new_speed = max(0.1, self.auto_scroll_speed - 0.5)
+        new_speed = max(0.1, self.scroller.speed - 0.5)
         self.speed_var.set(new_speed)
         self.update_speed(new_speed)
     
@@ -610,86 +409,52 @@ class HexRangeExplorer:
         if self.auto_scroll_enabled:
             self.toggle_auto_scroll()
         
-        self.last_mouse_x = event.x
+        self.scroller.x = event.x
         
-        value = self.get_value_at_position(event.x)
+        # Only the latest position of a burst of events is handled
+        self.frames.request('motion', lambda: self.track_pointer(event.x, event.y))
+    
+    def track_pointer(self, x, y):
+        """Scan the value under the pointer and show it, once per frame"""
+        value = self.get_value_at_position(x)
         
         # Process hex value
         self.process_hex_value(value)
-            
+        
         # Update labels with enhanced information
-        self.position_label.config(text=f"Position: ({event.x}, {event.y})")
-        self.hex_label.config(text=f"Hex: 0x{value:x}")
-        self.decimal_label.config(text=f"Decimal: {value:,}")
+        self.update_labels(x, y, value)
         
         # Draw enhanced crosshair
-        self.canvas.delete("crosshair")
-        
-        # Vertical line
-        self.canvas.create_line(event.x, 0, event.x, self.canvas_height - 40,
-                              fill='yellow', width=1, tags="crosshair")
-        # Horizontal line
-        self.canvas.create_line(0, event.y, self.canvas_width, event.y,
-                              fill='yellow', width=1, tags="crosshair", dash=(3, 3))
-        
-        # Highlight current value on scale
-        self.canvas.create_rectangle(event.x - 2, self.canvas_height - 40,
-                                   event.x + 2, self.canvas_height,
-                                   fill='yellow', tags="crosshair")
+        self.place_crosshair(x, y, 'yellow', 1, 2)
     
     def on_click(self, event):
         """Handle mouse click - start dragging"""
         self.drag_start_x = event.x
-        self.drag_start_viewport = (self.viewport_start, self.viewport_end)
+        self.drag_start_viewport = self.viewport.start_fp
         
     def on_drag(self, event):
         """Handle mouse drag - pan the view"""
         if self.drag_start_x is None:
             return
             
-        # Calculate drag distance as fraction of canvas
-        drag_fraction = Decimal(self.drag_start_x - event.x) / Decimal(self.canvas_width)
-        
-        # Calculate offset
-        viewport_size = self.drag_start_viewport[1] - self.drag_start_viewport[0]
-        offset = drag_fraction * viewport_size
-        
-        # Update viewport
-        self.viewport_start = self.drag_start_viewport[0] + offset
-        self.viewport_end = self.drag_start_viewport[1] + offset
-        
-        # Clamp to valid range
-        if self.viewport_start < self.range_start_dec:
-            self.viewport_end = self.viewport_end + (self.range_start_dec - self.viewport_start)
-            self.viewport_start = self.range_start_dec
-        elif self.viewport_end > self.range_end_dec:
-            self.viewport_start = self.viewport_start - (self.viewport_end - self.range_end_dec)
-            self.viewport_end = self.range_end_dec
+        # Calculate offset, the dragged pixels at the current scale
+        offset = self.viewport.pixels_fp(self.drag_start_x - event.x)
+        
+        # Update viewport, clamped to the valid range
+        self.viewport.set_start(self.drag_start_viewport + offset)
             
         # Redraw
-        self.draw_display()
-        self.update_zoom_info()
-        
+        self.request_redraw()
+        self.frames.request('motion', lambda: self.track_drag(event.x, event.y))
+    
+    def track_drag(self, x, y):
         # Process only the value at the center of the screen for better performance
         center_x = self.canvas_width // 2
-        center_value = self.get_value_at_position(center_x)
-        self.process_hex_value(center_value)
-        
-        # Update labels for current mouse position
-        current_value = self.get_value_at_position(event.x)
-        self.position_label.config(text=f"Position: ({event.x}, {event.y})")
-        self.hex_label.config(text=f"Hex: 0x{current_value:x}")
-        self.decimal_label.config(text=f"Decimal: {current_value:,}")
-        
-        # Draw crosshair
-        self.canvas.delete("crosshair")
-        self.canvas.create_line(event.x, 0, event.x, self.canvas_height - 40,
-                              fill='yellow', width=1, tags="crosshair")
-        self.canvas.create_line(0, event.y, self.canvas_width, event.y,
-                              fill='yellow', width=1, tags="crosshair", dash=(3, 3))
-        self.canvas.create_rectangle(event.x - 2, self.canvas_height - 40,
-                                   event.x + 2, self.canvas_height,
-                                   fill='yellow', tags="crosshair")
+        self.process_hex_value(self.get_value_at_position(center_x))
+        
+        # Update labels and crosshair for current mouse position
+        self.update_labels(x, y, self.get_value_at_position(x))
+        self.place_crosshair(x, y, 'yellow', 1, 2)
     
     def on_mouse_release(self, event):
         """Handle mouse button release - stop dragging"""
@@ -701,98 +466,67 @@ class HexRangeExplorer:
     def on_mouse_wheel(self, event):
         """Handle mouse wheel for Windows/MacOS"""
         # Get value under mouse before zoom
-        value_under_mouse = Decimal(self.get_value_at_position(event.x))
+        value_under_mouse = self.get_value_at_position(event.x)
         
         # Calculate zoom factor - more gradual zooming
         if event.delta > 0:  # Zoom in
-            zoom_factor = Decimal('0.9')
+            zoom_factor = Fraction('0.9')
         else:  # Zoom out
-            zoom_factor = Decimal('1.11')
+            zoom_factor = Fraction('1.11')
             
         self.apply_zoom(zoom_factor, event.x, value_under_mouse)
     
     def on_mouse_wheel_linux_up(self, event):
         """Handle mouse wheel up for Linux"""
-        value_under_mouse = Decimal(self.get_value_at_position(event.x))
-        self.apply_zoom(Decimal('0.9'), event.x, value_under_mouse)
+        value_under_mouse = self.get_value_at_position(event.x)
+        self.apply_zoom(Fraction('0.9'), event.x, value_under_mouse)
     
     def on_mouse_wheel_linux_down(self, event):
         """Handle mouse wheel down for Linux"""
-        value_under_mouse = Decimal(self.get_value_at_position(event.x))
-        self.apply_zoom(Decimal('1.11'), event.x, value_under_mouse)
+        value_under_mouse = self.get_value_at_position(event.x)
+        self.apply_zoom(Fraction('1.11'), event.x, value_under_mouse)
         
     def apply_zoom(self, zoom_factor, mouse_x, value_under_mouse):
         """Apply zoom transformation"""
-        # Calculate mouse position as fraction
-        mouse_fraction = Decimal(mouse_x) / Decimal(self.canvas_width)
-        
-        # Current viewport size
-        old_size = self.viewport_end - self.viewport_start
-        
-        # New viewport size
-        new_size = old_size * zoom_factor
-        
-        # Minimum size (at least 1 value)
-        if new_size < 1:
-            new_size = Decimal('1')
-        
-        # Maximum size (entire range)
-        if new_size > self.range_size_dec:
-            new_size = self.range_size_dec
-            
-        # Calculate new viewport to keep value under mouse at same position
-        new_start = value_under_mouse - mouse_fraction * new_size
-        new_end = new_start + new_size
-        
-        # Adjust if outside bounds
-        if new_start < self.range_start_dec:
-            new_end = new_end + (self.range_start_dec - new_start)
-            new_start = self.range_start_dec
-        elif new_end > self.range_end_dec:
-            new_start = new_start - (new_end - self.range_end_dec)
-            new_end = self.range_end_dec
-            
-        self.viewport_start = new_start
-        self.viewport_end = new_end
+        self.viewport.zoom(zoom_factor, mouse_x, value_under_mouse)
         
         # Redraw
-        self.draw_display()
-        self.update_zoom_info()
+        self.request_redraw()
         
     def update_zoom_info(self):
         """Update zoom information label with enhanced details"""
-        viewport_size = self.viewport_end - self.viewport_start
-        zoom_level = self.range_size_dec / viewport_size
+        viewport_size_fp = self.viewport.size_fp
+        zoom_level = self.viewport.zoom_level()
         
         # Calculate values per pixel
-        values_per_pixel = viewport_size / Decimal(self.canvas_width)
+        values_per_pixel = self.viewport.values_per_pixel()
         
-        start_int = int(self.viewport_start)
-        end_int = int(self.viewport_end)
+        start_int = self.viewport.start_fp >> FRAC_BITS
+        end_int = self.viewport.end_fp >> FRAC_BITS
         
         # Format zoom level
         if zoom_level > 1000000:
-            zoom_str = f"{float(zoom_level):.2e}x"
+            zoom_str = f"{zoom_level:.2e}x"
         else:
-            zoom_str = f"{float(zoom_level):.2f}x"
+            zoom_str = f"{zoom_level:.2f}x"
         
         # Create info text
         info_text = f"Zoom: {zoom_str} | Range: 0x{start_int:x} - 0x{end_int:x}"
         
         # Add viewport size info
-        if viewport_size < 1000:
-            info_text += f" | Size: {int(viewport_size)} values"
+        if viewport_size_fp < 1000 * ONE:
+            info_text += f" | Size: {viewport_size_fp >> FRAC_BITS} values"
         else:
-            info_text += f" | Size: {float(viewport_size):.2e} values"
+            info_text += f" | Size: {viewport_size_fp / ONE:.2e} values"
         
         self.zoom_info_label.config(text=info_text)
         
         # Update window title
         if values_per_pixel > 1:
-            vpp_str = f"{float(values_per_pixel):.2e}" if values_per_pixel > 1000 else f"{float(values_per_pixel):.2f}"
+            vpp_str = f"{values_per_pixel:.2e}" if values_per_pixel > 1000 else f"{values_per_pixel:.2f}"
             self.root.title(f"Hex Range Explorer - {vpp_str} values/pixel")
         else:
-            pixels_per_value = 1 / float(values_per_pixel)
+            pixels_per_value = 1 / values_per_pixel
             self.root.title(f"Hex Range Explorer - {pixels_per_value:.1f} pixels/value")
 
 def main():
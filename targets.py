@@ -0,0 +1,164 @@
+import os
+import secp256k1 as ice
+
+# Sorted binary file currently loaded into the secp256k1 library of this process
+_loaded_bin_file = None
+
+def line_to_h160(line):
+    """Hash160 bytes of one target line: an address or 40 hex chars, optionally 0x prefixed"""
+    token = line.split()[0]
+    if token[:2].lower() == '0x':
+        token = token[2:]
+    if len(token) == 40 and all(c in '0123456789abcdefABCDEF' for c in token):
+        return bytes.fromhex(token)
+    if token[:3].lower() == 'bc1':
+        return bytes.fromhex(ice.bech32_address_decode(token))
+    return bytes.fromhex(ice.address_to_h160(token))
+
+def _is_newer(path, source):
+    """True if path exists and was written after source"""
+    return os.path.isfile(path) and os.path.getmtime(path) >= os.path.getmtime(source)
+
+def find_target(hashes, target_h160):
+    """Index of the first hash160 in a packed batch equal to the target, or None"""
+    pos = hashes.find(target_h160)
+    while pos != -1:
+        if pos % 20 == 0:
+            return pos // 20
+        pos = hashes.find(target_h160, pos + 1)
+    return None
+
+class TargetSet:
+    """The hash160s a scan is looking for.
+
+    A single target is matched with one substring search over the batch. A
+    target file is turned into the sorted binary format of prepare_bin_file and
+    loaded with Load_data_to_memory, so every candidate costs one check_collision
+    call no matter how many targets there are.
+
+    With bloom_fp set, a Bloom filter sized by bloom_para for the target count
+    is checked for the whole batch first and only its positives go to the
+    exact lookup. A filter read from bloom_file is memory-mapped, so every
+    process scanning the same target file shares one copy of it."""
+
+    def __init__(self, h160s=(), bin_file=None, bloom_fp=None, bloom_threads=1, bloom_file=None):
+        self.h160s = list(h160s)
+        self.h160_set = set(self.h160s)
+        self.bin_file = bin_file
+        self.bloom = None
+        self.bloom_file = bloom_file
+        self.bloom_threads = bloom_threads
+        if bloom_file is not None:
+            self.bloom = ice.read_bloom_file(bloom_file)
+        elif bloom_fp:
+            self.bloom = ice.Fill_in_bloom(self.records(), bloom_fp)
+
+    def __getstate__(self):
+        # A mapped filter travels as its file name and is mapped again on arrival
+        state = self.__dict__.copy()
+        if self.bloom_file is not None:
+            state['bloom'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.bloom_file is not None:
+            self.bloom = ice.read_bloom_file(self.bloom_file)
+
+    @classmethod
+    def from_address(cls, address):
+        return cls([line_to_h160(address)])
+
+    @classmethod
+    def from_file(cls, path, bin_file=None, bloom_fp=0.000001, bloom_threads=1):
+        """Targets from a file of addresses or hash160 hex, one per line.
+
+        The sorted binary is written next to the list as <path>.bin and reused
+        as long as it is newer than the list. So is the Bloom filter, as
+        <path>.bin.bloom, as long as it is newer than the binary and has the
+        same false positive rate."""
+        bin_file = bin_file or path + '.bin'
+        if not _is_newer(bin_file, path):
+            hex_file = bin_file + '.hex'
+            count = 0
+            with open(path, 'r') as src, open(hex_file, 'w') as dst:
+                for line in src:
+                    if line.strip() and not line.startswith('#'):
+                        dst.write(line_to_h160(line).hex() + '\n')
+                        count += 1
+            if count == 0:
+                os.remove(hex_file)
+                raise ValueError(f"No targets in {path}, only blank or comment lines")
+            # Sorted in bounded memory, however long the list
+            ice.prepare_bin_file(hex_file, bin_file, overwrite=True, chunk_records=2000000, dedupe=True)
+            os.remove(hex_file)
+        bloom_file = None
+        if bloom_fp:
+            bloom_file = bin_file + '.bloom'
+            if not _is_newer(bloom_file, bin_file) or ice.read_bloom_file(bloom_file)[3] != bloom_fp:
+                # Streamed from the binary, so the list is never held in memory
+                bloom = ice.Fill_in_bloom_file(bin_file, bloom_fp)
+                ice.dump_bloom_file(bloom_file + '.tmp', *bloom)
+                os.replace(bloom_file + '.tmp', bloom_file)
+        return cls(bin_file=bin_file, bloom_threads=bloom_threads, bloom_file=bloom_file)
+
+    def records(self):
+        """Every target hash160 as a list of 20 byte strings"""
+        if self.bin_file is None:
+            return list(self.h160s)
+        with open(self.bin_file, 'rb') as f:
+            data = f.read()
+        return [data[i:i + 20] for i in range(0, len(data), 20)]
+
+    def __len__(self):
+        if self.bin_file is not None:
+            return os.path.getsize(self.bin_file) // 20
+        return len(self.h160s)
+
+    def load(self):
+        """Load the sorted binary into this process, once"""
+        global _loaded_bin_file
+        if self.bin_file is not None and _loaded_bin_file != self.bin_file:
+            ice.Load_data_to_memory(self.bin_file, False)
+            _loaded_bin_file = self.bin_file
+
+    def is_target(self, h160):
+        """Exact membership check for one hash160"""
+        if self.bin_file is None:
+            return h160 in self.h160_set
+        self.load()
+        return ice.check_collision(h160)
+
+    def find(self, hashes):
+        """Index of the first hash160 of a packed batch that is a target, or None"""
+        if self.bloom is not None:
+            return self.find_with_bloom(hashes)
+        if self.bin_file is None:
+            if len(self.h160s) == 1:
+                return find_target(hashes, self.h160s[0])
+            targets = self.h160_set
+            for i in range(0, len(hashes), 20):
+                if hashes[i:i + 20] in targets:
+                    return i // 20
+            return None
+
+        self.load()
+        check_collision = ice.check_collision
+        for i in range(0, len(hashes), 20):
+            if check_collision(hashes[i:i + 20]):
+                return i // 20
+        return None
+
+    def find_with_bloom(self, hashes):
+        num = len(hashes) // 20
+        if num == 0:
+            return None
+        _bits, _hashes, _bf, _fp, _elem = self.bloom
+        flags = ice.bloom_check_add_mcpu(hashes, num, 20, self.bloom_threads, 0, _bits, _hashes, _bf)
+        # Only Bloom positives pay for the exact lookup
+        i = flags.find(b'\x01')
+        while i != -1:
+            if self.is_target(hashes[20 * i:20 * i + 20]):
+                return i
+            i = flags.find(b'\x01', i + 1)
+        return None
@@ -0,0 +1,141 @@
+"""Batch candidate generation with NumPy.
+
+Transformed values up to 128 bits are held as two uint64 lanes (hi, lo), so
+every plan stage runs over a whole batch of input values at once and the
+keys come out as one contiguous 32 byte big-endian buffer, in the same order
+as joining Plan.keys() of each value.
+
+NumPy is optional. Without it, or for plans wider than 128 bits, the batch
+is generated one value at a time with the integer kernel of plans.py. It is
+imported by the first BatchGenerator, so scans of single values never load it."""
+
+np = None
+
+def _import_numpy():
+    """True once NumPy is imported into np, False if it is not installed"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+M64 = (1 << 64) - 1
+
+def _lanes(value):
+    return value >> 64, value & M64
+
+def _shl(hi, lo, k):
+    if k == 0:
+        return hi, lo
+    if k >= 64:
+        return lo << np.uint64(k - 64), np.zeros_like(lo)
+    return (hi << np.uint64(k)) | (lo >> np.uint64(64 - k)), lo << np.uint64(k)
+
+def _shr(hi, lo, k):
+    if k == 0:
+        return hi, lo
+    if k >= 64:
+        return np.zeros_like(hi), hi >> np.uint64(k - 64)
+    return hi >> np.uint64(k), (lo >> np.uint64(k)) | (hi << np.uint64(64 - k))
+
+def _stack(outputs):
+    """List of (hi, lo) per parameter to (M, P) lanes, parameters varying fastest"""
+    return (np.stack([hi for hi, lo in outputs], axis=1),
+            np.stack([lo for hi, lo in outputs], axis=1))
+
+def _vector_invert(params, bits):
+    full_hi, full_lo = (np.uint64(m) for m in _lanes((1 << bits) - 1))
+    def expand(hi, lo):
+        flipped = (hi ^ full_hi, lo ^ full_lo)
+        return _stack([flipped if p else (hi, lo) for p in params])
+    return expand
+
+def _vector_reverse(params, bits):
+    table = np.array([int(format(b, '08b')[::-1], 2) for b in range(256)], dtype=np.uint8)
+    def reverse64(lane):
+        return table[lane.view(np.uint8)].view(np.uint64).byteswap()
+    def expand(hi, lo):
+        reversed_ = _shr(reverse64(lo), reverse64(hi), 128 - bits)
+        return _stack([reversed_ if p else (hi, lo) for p in params])
+    return expand
+
+def _vector_shift(params, bits):
+    full_hi, full_lo = (np.uint64(m) for m in _lanes((1 << bits) - 1))
+    def rotl(hi, lo, n):
+        if n == 0:
+            return hi, lo
+        left_hi, left_lo = _shl(hi, lo, n)
+        right_hi, right_lo = _shr(hi, lo, bits - n)
+        return (left_hi | right_hi) & full_hi, (left_lo | right_lo) & full_lo
+    def expand(hi, lo):
+        return _stack([rotl(hi, lo, n % bits) for n in params])
+    return expand
+
+def _vector_xor(params, bits):
+    full = (1 << bits) - 1
+    masks = [tuple(np.uint64(m) for m in _lanes(m & full)) for m in params]
+    def expand(hi, lo):
+        return _stack([(hi ^ m_hi, lo ^ m_lo) for m_hi, m_lo in masks])
+    return expand
+
+def _vector_rotate(params, bits):
+    if bits % 4:
+        raise ValueError("rotate needs a bit width that is a multiple of 4")
+    ones = int('1' * (bits // 4), 16)
+    high = [np.uint64(m) for m in _lanes(ones * 0x8)]
+    low = [np.uint64(m) for m in _lanes(ones * 0x7)]
+    addends = [[np.uint64(m) for m in _lanes((n % 16) * ones)] for n in params]
+    def add(v, a, lane):
+        # Same masked add as plans._expand_rotate, nibbles never straddle the lanes
+        return ((v & low[lane]) + (a & low[lane])) ^ ((v & high[lane]) ^ (a & high[lane]))
+    def expand(hi, lo):
+        return _stack([(add(hi, a_hi, 0), add(lo, a_lo, 1)) for a_hi, a_lo in addends])
+    return expand
+
+VECTOR_STAGES = {
+    'invert': _vector_invert,
+    'reverse': _vector_reverse,
+    'shift': _vector_shift,
+    'xor': _vector_xor,
+    'rotate': _vector_rotate,
+}
+
+class BatchGenerator:
+    """Candidate keys of a plan for many input values per call"""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.vectorized = plan.bits <= 128 and _import_numpy()
+        if self.vectorized:
+            self.expanders = [VECTOR_STAGES[name](params, plan.bits) for name, params in plan.stages]
+            # Prefix bits of each big-endian 64 bit word of the key
+            self.prefix_words = [(plan.prefix >> shift) & M64 for shift in (192, 128, 64, 0)]
+
+    def keys(self, values, groups=None):
+        """Packed buffer of 32 byte big-endian keys for every value, value by value in plan order"""
+        if not self.vectorized:
+            return b''.join([self.plan.keys(value, groups) for value in values])
+        if not values:
+            return b''
+
+        starts = [self.plan.start_value(value) for value in values]
+        hi = np.array([v >> 64 for v in starts], dtype=np.uint64)
+        lo = np.array([v & M64 for v in starts], dtype=np.uint64)
+        last = len(self.expanders) - 1
+        for i, expand in enumerate(self.expanders):
+            if i == last and groups is not None:
+                hi = hi.reshape(len(values), -1)[:, groups].ravel()
+                lo = lo.reshape(len(values), -1)[:, groups].ravel()
+            hi, lo = expand(hi, lo)
+            hi = hi.ravel()
+            lo = lo.ravel()
+
+        words = np.empty((len(lo), 4), dtype='>u8')
+        words[:, 0] = self.prefix_words[0]
+        words[:, 1] = self.prefix_words[1]
+        words[:, 2] = hi | np.uint64(self.prefix_words[2])
+        words[:, 3] = lo | np.uint64(self.prefix_words[3])
+        return words.tobytes()
@@ -0,0 +1,256 @@
+from fractions import Fraction
+import math
+import random
+
+# Fraction bits of the fixed-point viewport position and scale
+FRAC_BITS = 64
+ONE = 1 << FRAC_BITS
+
+def round_half_even(numerator, denominator):
+    """numerator / denominator rounded to the nearest integer, ties to even"""
+    q, r = divmod(numerator, denominator)
+    if 2 * r > denominator or (2 * r == denominator and q & 1):
+        q += 1
+    return q
+
+class Viewport:
+    """The visible part of the range and the mapping from pixel columns to values.
+
+    The position is exact integer fixed point with FRAC_BITS fraction bits:
+    start_fp is the value at the left edge and size_fp the values across the
+    canvas, so the scale is the exact ratio size_fp / width and the value under
+    a column is an integer multiply, add and divide."""
+
+    def __init__(self, range_start, range_end, width):
+        self.range_start = range_start
+        self.range_end = range_end
+        self.range_size = range_end - range_start + 1
+        self.width = width
+
+        self.range_start_fp = range_start << FRAC_BITS
+        self.range_end_fp = range_end << FRAC_BITS
+
+        self.start_fp = self.range_start_fp
+        self.size_fp = self.range_end_fp - self.range_start_fp
+
+    @property
+    def end_fp(self):
+        return self.start_fp + self.size_fp
+
+    def zoom_level(self):
+        return (self.range_size << FRAC_BITS) / self.size_fp
+
+    def values_per_pixel(self):
+        return self.size_fp / (self.width << FRAC_BITS)
+
+    def set_start(self, start_fp):
+        """Move the viewport, shifting it back inside the range if needed"""
+        if start_fp < self.range_start_fp:
+            start_fp = self.range_start_fp
+        elif start_fp + self.size_fp > self.range_end_fp:
+            start_fp = self.range_end_fp - self.size_fp
+        self.start_fp = start_fp
+
+    def pan(self, delta_fp):
+        self.set_start(self.start_fp + delta_fp)
+
+    def pixels_fp(self, pixels):
+        """Fixed-point span of a (possibly fractional) number of pixels"""
+        numerator, denominator = pixels.as_integer_ratio()
+        return self.size_fp * numerator // (denominator * self.width)
+
+    def floor_value_at(self, x):
+        """The integer part of the exact value at a column, as the colour and scale code uses"""
+        return (self.start_fp * self.width + x * self.size_fp) // (self.width << FRAC_BITS)
+
+    def value_at(self, x):
+        """The hex value at a given canvas position, rounded to the nearest integer"""
+        value = round_half_even(self.start_fp * self.width + x * self.size_fp, self.width << FRAC_BITS)
+
+        # Ensure within bounds
+        return max(self.range_start, min(self.range_end, value))
+
+    def column_at(self, value):
+        """Canvas column showing a value"""
+        return ((value << FRAC_BITS) - self.start_fp) * self.width // self.size_fp
+
+    def zoom(self, zoom_factor, x, value_under_mouse):
+        """Scale the viewport by zoom_factor keeping value_under_mouse at column x"""
+        zoom_factor = Fraction(zoom_factor)
+        new_size = self.size_fp * zoom_factor.numerator // zoom_factor.denominator
+
+        # Minimum size (at least 1 value)
+        new_size = max(new_size, ONE)
+
+        # Maximum size (entire range)
+        new_size = min(new_size, self.range_size << FRAC_BITS)
+
+        # Calculate new viewport to keep value under mouse at same position
+        self.size_fp = new_size
+        self.set_start((value_under_mouse << FRAC_BITS) - x * new_size // self.width)
+
+class VisitHistogram:
+    """Visit counts over equal cells of the range, a coarse memory of where the walk has been"""
+
+    def __init__(self, range_start, range_end, cells=4096):
+        self.range_start = range_start
+        self.range_size = range_end - range_start + 1
+        self.cells = cells
+        self.counts = [0] * cells
+        self.total = 0
+
+    def cell(self, value):
+        return min(self.cells - 1, max(0, (value - self.range_start) * self.cells // self.range_size))
+
+    def cell_center(self, cell):
+        return self.range_start + (2 * cell + 1) * self.range_size // (2 * self.cells)
+
+    def add(self, value):
+        self.counts[self.cell(value)] += 1
+        self.total += 1
+
+    def visits(self, value):
+        return self.counts[self.cell(value)]
+
+    def least_visited(self, samples=8):
+        """The least visited of a few random cells"""
+        return min(random.sample(range(self.cells), min(samples, self.cells)), key=self.counts.__getitem__)
+
+class AutoScroller:
+    """Random-walk and linear auto-scroll motion over a Viewport.
+
+    Each call to step() advances one frame and returns the column and value to
+    scan, so the same motion can drive the Tk explorer or a headless loop.
+
+    The random walk keeps a VisitHistogram of the values it returns. New
+    targets, zoom targets and jumps are drawn as before, but from a few
+    candidates it keeps the one leading to the least visited cells, so long
+    runs drift toward parts of the range they have not seen. cells=0 turns
+    the walk back into the memoryless one."""
+
+    def __init__(self, viewport, speed=1.0, direction=1, random_mode=False, cells=4096):
+        self.viewport = viewport
+        self.histogram = VisitHistogram(viewport.range_start, viewport.range_end, cells) if cells else None
+        self.speed = speed  # pixels per frame
+        self.direction = direction  # 1 for right, -1 for left
+        self.random_mode = random_mode  # Random walk mode
+        self.random_change_interval = 30  # Frames before changing direction
+        self.random_frame_count = 0
+        self.random_target_x = viewport.width // 2
+        self.random_velocity_x = 0
+        self.random_zoom_target = 1.0  # Target zoom level
+        self.random_zoom_velocity = 0  # Zoom velocity
+        self.x = viewport.width // 2
+
+    def start_random_walk(self):
+        self.random_target_x = random.randint(0, self.viewport.width)
+        self.random_velocity_x = 0
+
+    def step(self):
+        """Advance one frame. Returns (x, value, zoomed)"""
+        if self.random_mode:
+            x, value, zoomed = self.random_step()
+        else:
+            x, value, zoomed = self.linear_step()
+        if self.histogram is not None:
+            self.histogram.add(value)
+        return x, value, zoomed
+
+    def _least_visited(self, candidates, value_of):
+        """The candidate whose value falls in the least visited cell, the first one on ties"""
+        if self.histogram is None:
+            return candidates[0]
+        return min(candidates, key=lambda c: self.histogram.visits(value_of(c)))
+
+    def _jump_amount(self):
+        """Viewport shift of a random jump: a local jump, or a jump to a rarely visited cell"""
+        vp = self.viewport
+        local = [int(vp.size_fp * Fraction(random.uniform(-0.5, 0.5))) for _ in range(3 if self.histogram else 1)]
+        if self.histogram is None:
+            return local[0]
+        center = vp.start_fp + vp.size_fp // 2
+        far = (self.histogram.cell_center(self.histogram.least_visited()) << FRAC_BITS) - center
+        return self._least_visited(local + [far], lambda amount: (center + amount) >> FRAC_BITS)
+
+    def _zoom_target(self):
+        # Random zoom between 0.5x and 100000x on logarithmic scale
+        log_min = math.log10(0.5)
+        log_max = math.log10(100000)
+        targets = [10 ** random.uniform(log_min, log_max) for _ in range(2 if self.histogram else 1)]
+        if self.histogram is None:
+            return targets[0]
+        # Over-visited neighbourhoods are left by zooming out, where each column spans more cells
+        center = self.viewport.value_at(self.viewport.width // 2)
+        if self.histogram.visits(center) * self.histogram.cells > self.histogram.total:
+            return min(targets)
+        return targets[0]
+
+    def linear_step(self):
+        vp = self.viewport
+        scroll_amount = vp.pixels_fp(self.speed) * self.direction
+
+        new_start = vp.start_fp + scroll_amount
+
+        # Bounce off the ends of the range
+        if new_start < vp.range_start_fp:
+            self.direction = 1
+        elif new_start + vp.size_fp > vp.range_end_fp:
+            self.direction = -1
+        vp.set_start(new_start)
+
+        center_x = vp.width // 2
+        return center_x, vp.value_at(center_x), True
+
+    def random_step(self):
+        vp = self.viewport
+        self.random_frame_count += 1
+
+        # Change target occasionally or when reached
+        if self.random_frame_count >= self.random_change_interval or abs(self.random_target_x - self.x) < 5:
+            self.random_frame_count = 0
+            self.random_change_interval = random.randint(20, 60)  # Vary the interval
+
+            # Choose new random target position
+            candidates = [random.randint(0, vp.width) for _ in range(3 if self.histogram else 1)]
+            self.random_target_x = self._least_visited(candidates, vp.value_at)
+
+            # Also change zoom target occasionally
+            if random.random() < 0.3:  # 30% chance to change zoom
+                self.random_zoom_target = self._zoom_target()
+
+            # Occasionally do a random jump in the viewport
+            if random.random() < 0.1:  # 10% chance
+                vp.pan(self._jump_amount())
+
+        # Handle random zooming
+        zoom_diff = math.log10(self.random_zoom_target / vp.zoom_level())
+        self.random_zoom_velocity += zoom_diff * 0.05  # Acceleration
+        self.random_zoom_velocity *= 0.9  # Damping
+
+        # Apply zoom change
+        zoomed = False
+        if abs(self.random_zoom_velocity) > 0.001:
+            zoom_factor = 1.0 - (self.random_zoom_velocity * 0.02 * self.speed)
+            zoom_factor = max(0.95, min(1.05, zoom_factor))  # Limit zoom speed
+
+            # Get value at current position before zoom
+            current_x = int(self.x)
+            value_under_cursor = vp.value_at(current_x)
+            vp.zoom(zoom_factor, current_x, value_under_cursor)
+            zoomed = True
+
+        # Smooth movement towards target
+        diff = self.random_target_x - self.x
+        self.random_velocity_x += diff * 0.1  # Acceleration
+        self.random_velocity_x *= 0.9  # Damping
+
+        # Apply velocity with speed scaling
+        move_x = self.random_velocity_x * self.speed * 0.1
+        new_x = self.x + move_x
+
+        # Keep within bounds
+        new_x = max(0, min(vp.width, new_x))
+
+        # Update position for next frame
+        self.x = int(new_x)
+        return self.x, vp.value_at(self.x), zoomed